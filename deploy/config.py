@@ -32,6 +32,10 @@ class ConfigModel:
     WebuiHost: str = "localhost"
     WebuiPort: int = 12271
 
+    OcrServer: bool = False
+    OcrBackend: str = "pytorch"
+    OcrThreads: int = 0
+
 
 class DeployConfig(ConfigModel):
     def __init__(self, file=DEPLOY_CONFIG):
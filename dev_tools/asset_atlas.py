@@ -0,0 +1,82 @@
+import importlib
+import os
+
+from module.base.atlas import ASSET_ATLAS
+from module.base.button import Button
+from module.base.resource import Resource
+from module.base.template import Template
+from module.base.utils import load_image
+from module.logger import logger
+
+MODULE_FOLDER = './module'
+BUTTON_FILE = 'assets.py'
+
+
+def import_assets():
+    """
+    Import all assets.py generated by dev_tools/button_extract.py, so Buttons and Templates are recorded in Resource.
+    """
+    for root, _, files in os.walk(MODULE_FOLDER):
+        if BUTTON_FILE not in files:
+            continue
+        module = os.path.relpath(os.path.join(root, BUTTON_FILE), '.')
+        module = os.path.splitext(module)[0].replace('\\', '.').replace('/', '.')
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning(f'Failed to import {module}: {e}')
+
+
+def server_values(data):
+    """
+    Args:
+        data (dict, any): Raw property of Button, may be different on each server.
+
+    Returns:
+        dict: key: server, value: property
+    """
+    if isinstance(data, dict):
+        return data
+    return {'': data}
+
+
+def iter_templates():
+    """
+    Yields:
+        tuple[str, tuple, np.ndarray]: file, area, image
+    """
+    for obj in list(Resource.instances.values()):
+        if isinstance(obj, Button):
+            files = server_values(obj.raw_file)
+            areas = server_values(obj.raw_area)
+            for server, file in files.items():
+                area = areas.get(server, areas.get(''))
+                if not file or area is None or os.path.splitext(file)[1] == '.gif':
+                    continue
+                yield file, tuple(area), load_image(file, area)
+        elif isinstance(obj, Template):
+            for file in server_values(obj.raw_file).values():
+                if not file or os.path.splitext(file)[1] == '.gif':
+                    continue
+                yield file, None, load_image(file)
+
+
+class AtlasBuilder:
+    """
+    Pack cropped templates of all assets into ./bin/assets/atlas.bin, with an index atlas.json.
+    Run this after dev_tools/button_extract.py.
+
+    Buttons and Templates read templates from the atlas if the asset file didn't change since the atlas was built,
+    otherwise they fall back to load_image().
+    """
+
+    def __init__(self):
+        logger.info('Asset atlas build')
+        import_assets()
+        count = ASSET_ATLAS.build(iter_templates())
+        size = os.path.getsize(os.path.join(ASSET_ATLAS.folder, 'atlas.bin'))
+        logger.info(f'Packed {count} templates, {round(size / 1024 / 1024, 2)}MB')
+
+
+if __name__ == '__main__':
+    AtlasBuilder()
@@ -0,0 +1,80 @@
+import os
+import re
+
+from module.base.utils import load_image, save_image, image_size
+from module.logger import logger
+from module.ocr.models import OcrModel
+
+# Full screenshots to find text lines on
+SCREENSHOT_FOLDER = './assets'
+# Same as dev_tools/ocr_onnx_parity.py
+OCR_CORPUS = './bin/ocr_corpus'
+# Max screenshots to use, picked evenly from all screenshots
+LIMIT = 100
+
+
+class OcrCorpusBuild:
+    """
+    Build the crop corpus of dev_tools/ocr_onnx_parity.py from full screenshots under ./assets.
+    Text lines are found by the detection model, the same crops recognition gets in NikkeOcr.ocr().
+    All crops go to `nikke` and `cnocr`, crops recognized as digits go to `cnocr_num` too.
+
+    Usage:
+        python -m dev_tools.ocr_corpus_build
+    """
+
+    def __init__(self, folder=SCREENSHOT_FOLDER, output=OCR_CORPUS, limit=LIMIT):
+        """
+        Args:
+            folder (str):
+            output (str):
+            limit (int):
+        """
+        self.folder = folder
+        self.output = output
+        self.limit = limit
+
+    def screenshots(self):
+        """
+        Returns:
+            list[str]: Files of 720x1280 screenshots.
+        """
+        files = []
+        for root, _, names in os.walk(self.folder):
+            for name in names:
+                if name.endswith('.png'):
+                    files.append(os.path.join(root, name).replace('\\', '/'))
+        files = sorted(files)
+        files = [file for file in files if image_size(load_image(file)) == (720, 1280)]
+        if len(files) > self.limit:
+            step = len(files) / self.limit
+            files = [files[int(index * step)] for index in range(self.limit)]
+        return files
+
+    def run(self):
+        ocr = OcrModel.load_nikke(backend='pytorch')
+        for name in ['nikke', 'cnocr', 'cnocr_num']:
+            os.makedirs(os.path.join(self.output, name), exist_ok=True)
+
+        count = {'nikke': 0, 'cnocr': 0, 'cnocr_num': 0}
+        files = self.screenshots()
+        for index, file in enumerate(files):
+            if index % 10 == 0:
+                logger.info(f'Building {index}/{len(files)}')
+            stem = re.sub(r'[/.]+', '_', os.path.splitext(os.path.relpath(file, self.folder))[0]).strip('_')
+            crops = [box['cropped_img'] for box in ocr.det_model.detect(load_image(file))['detected_texts']]
+            results = ocr.ocr_for_single_lines(crops)
+            for line, (crop, result) in enumerate(zip(crops, results)):
+                models = ['nikke', 'cnocr']
+                if re.fullmatch(r'[\d,./]+', result['text']):
+                    models.append('cnocr_num')
+                for name in models:
+                    save_image(crop, os.path.join(self.output, name, f'{stem}_{line}.png'))
+                    count[name] += 1
+
+        for name, value in count.items():
+            logger.attr(name, f'{value} crops')
+
+
+if __name__ == '__main__':
+    OcrCorpusBuild().run()
@@ -0,0 +1,78 @@
+import os
+
+import torch
+
+from module.logger import logger
+from module.ocr.models import OcrModel
+from module.ocr.server import OcrServer
+
+
+class OcrOnnxExport:
+    """
+    Export recognition models of NikkeOcr from .ckpt to .onnx, next to the .ckpt files.
+    Set Deploy.Ocr.OcrBackend to `onnx` to use them.
+
+    Usage:
+        python -m dev_tools.ocr_onnx_export
+    """
+
+    def __init__(self, models=OcrServer.MODELS):
+        """
+        Args:
+            models (list[str]): Attribute names of OcrModel.
+        """
+        self.models = models
+
+    @staticmethod
+    def export(name):
+        """
+        Same as `cnocr export-onnx` in cnocr 2.3.1, which imports the whole training stack.
+
+        Args:
+            name (str): Attribute name of OcrModel.
+
+        Returns:
+            str: Output file.
+        """
+        ocr = getattr(OcrModel, f'load_{name}')(backend='pytorch')
+        model = ocr.rec_model._model
+        output = os.path.splitext(ocr.rec_model._model_fp)[0] + '.onnx'
+
+        x = torch.randn(1, 1, 32, 280)
+        input_lengths = torch.tensor([280])
+        # Postprocessor can't be exported
+        model.postprocessor = None
+        symbolic_names = {0: 'batch_size', 3: 'width'}
+        with torch.no_grad():
+            model.eval()
+            torch.onnx.export(
+                model,
+                args=(x, input_lengths),
+                f=output,
+                export_params=True,
+                do_constant_folding=True,
+                input_names=['x', 'input_lengths'],
+                output_names=['logits', 'output_lengths'],
+                dynamic_axes={
+                    'x': symbolic_names,
+                    'input_lengths': {0: 'batch_size'},
+                    'logits': {0: 'batch_size'},
+                },
+            )
+
+        try:
+            import onnx
+            onnx.checker.check_model(onnx.load(output))
+        except ImportError:
+            logger.info('Package onnx is not installed, skip model checking')
+        return output
+
+    def run(self):
+        for name in self.models:
+            logger.hr(name, level=2)
+            output = self.export(name)
+            logger.info(f'Model {name} is exported to {output}')
+
+
+if __name__ == '__main__':
+    OcrOnnxExport().run()
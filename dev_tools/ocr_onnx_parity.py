@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+
+from cnocr import CnOcr
+
+from dev_tools.ocr_corpus_build import OcrCorpusBuild
+from module.base.utils import load_image
+from module.logger import logger
+from module.ocr.models import OcrModel
+from module.ocr.server import OcrServer
+
+# Single line crops to check, ./bin/ocr_corpus/<model>/*.png, built by dev_tools/ocr_corpus_build.py
+OCR_CORPUS = './bin/ocr_corpus'
+# Min ratio of crops that both backends give the same text
+MIN_AGREEMENT = 0.99
+
+
+class OcrOnnxParity:
+    """
+    Check that the ONNX backend gives the same texts as the pytorch backend on a stored crop corpus.
+    Export models by dev_tools/ocr_onnx_export.py first.
+    Corpus is built from ./assets by dev_tools/ocr_corpus_build.py if it doesn't exist.
+
+    Usage:
+        python -m dev_tools.ocr_onnx_parity
+    """
+
+    def __init__(self, models=OcrServer.MODELS, folder=OCR_CORPUS, threads=0):
+        """
+        Args:
+            models (list[str]): Attribute names of OcrModel.
+            folder (str):
+            threads (int): Number of threads of ONNX Runtime.
+        """
+        self.models = models
+        self.folder = folder
+        self.threads = threads
+
+    def corpus(self, name):
+        """
+        Returns:
+            list[tuple[str, np.ndarray]]: File and image.
+        """
+        folder = os.path.join(self.folder, name)
+        if not os.path.exists(folder):
+            return []
+        files = sorted(f for f in os.listdir(folder) if f.endswith('.png'))
+        return [(file, load_image(os.path.join(folder, file))) for file in files]
+
+    @staticmethod
+    def recognize(ocr, images):
+        """
+        Returns:
+            list[dict], float: Results and time cost.
+        """
+        start = time.perf_counter()
+        # Call CnOcr directly, results of NikkeOcr are cached
+        results = CnOcr.ocr_for_single_lines(ocr, images)
+        return results, time.perf_counter() - start
+
+    def check(self, name):
+        """
+        Args:
+            name (str): Attribute name of OcrModel.
+
+        Returns:
+            bool: If agreement reaches MIN_AGREEMENT, False if there's no crop to check.
+        """
+        logger.hr(name, level=2)
+        corpus = self.corpus(name)
+        if not corpus:
+            logger.warning(f'No crops under {os.path.join(self.folder, name)}')
+            return False
+        files = [file for file, _ in corpus]
+        images = [image for _, image in corpus]
+
+        load = getattr(OcrModel, f'load_{name}')
+        start = time.perf_counter()
+        torch_ocr = load(backend='pytorch')
+        torch_load = time.perf_counter() - start
+        start = time.perf_counter()
+        onnx_ocr = load(backend='onnx')
+        onnx_load = time.perf_counter() - start
+        if onnx_ocr.backend != 'onnx':
+            logger.warning(f'ONNX model of {name} not found, export it first')
+            return False
+        if self.threads:
+            onnx_ocr.set_onnx_threads(self.threads)
+
+        # Warm up
+        self.recognize(torch_ocr, images[:1])
+        self.recognize(onnx_ocr, images[:1])
+        torch_results, torch_cost = self.recognize(torch_ocr, images)
+        onnx_results, onnx_cost = self.recognize(onnx_ocr, images)
+
+        mismatch = 0
+        for file, torch_result, onnx_result in zip(files, torch_results, onnx_results):
+            if torch_result['text'] != onnx_result['text']:
+                mismatch += 1
+                logger.warning(f'Mismatch {file}: pytorch "{torch_result["text"]}", onnx "{onnx_result["text"]}"')
+        agreement = 1 - mismatch / len(files)
+
+        logger.attr('Crops', len(files))
+        logger.attr('Agreement', f'{agreement:.2%}')
+        logger.attr('Load', f'pytorch {torch_load:.2f}s, onnx {onnx_load:.2f}s')
+        logger.attr('Recognize', f'pytorch {torch_cost:.2f}s, onnx {onnx_cost:.2f}s')
+        return agreement >= MIN_AGREEMENT
+
+    def run(self):
+        if not os.path.exists(self.folder):
+            logger.hr('Build corpus', level=2)
+            OcrCorpusBuild(output=self.folder).run()
+        result = [self.check(name) for name in self.models]
+        return all(result)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if OcrOnnxParity().run() else 1)
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+
+import cv2
+
+from dev_tools.asset_atlas import import_assets
+from module.base.button import Button
+from module.base.resource import Resource
+from module.base.utils import load_image
+from module.config.config import NikkeConfig
+from module.logger import logger
+
+# Thresholds to check, results of Button.match() should be the same on all of them
+THRESHOLDS = [0.71, NikkeConfig.BUTTON_MATCH_SIMILARITY, 0.8, 0.85, 0.95]
+# Screenshots to check for each button, besides the one it's extracted from
+SAMPLE = 3
+
+
+class PyramidMatchCheck:
+    """
+    Check that Button.match(static=False, pyramid=True) gives the same results as full resolution matching.
+    Assets under ./assets are full screenshots, each button is checked on the screenshot it's extracted from
+    and some other screenshots in the same folder.
+
+    Usage:
+        python -m dev_tools.pyramid_match_check
+    """
+
+    def __init__(self, sample=SAMPLE):
+        import_assets()
+        self.buttons = [b for b in Resource.instances.values()
+                        if isinstance(b, Button) and b.file and not b.is_gif]
+        self.sample = sample
+        self.images = {}
+        self.cost = {'full': 0., 'pyramid': 0.}
+        self.total = 0
+        self.mismatch = []
+
+    def screenshots(self, button):
+        """
+        Returns:
+            list[tuple[str, np.ndarray]]: File and image.
+        """
+        folder = os.path.dirname(button.file)
+        files = sorted(os.path.join(folder, f).replace('\\', '/') for f in os.listdir(folder) if f.endswith('.png'))
+        files.remove(button.file)
+        files = [button.file] + files[:self.sample]
+        out = []
+        for file in files:
+            if file not in self.images:
+                self.images[file] = load_image(file)
+            out.append((file, self.images[file]))
+        return out
+
+    def check(self, button, file, image):
+        button.ensure_template()
+        # Button.match() uses pyramid matching only on images much larger than template
+        if image.shape[0] * image.shape[1] < button.image.shape[0] * button.image.shape[1] * Button.PYRAMID_MIN_RATIO:
+            return
+        start = time.perf_counter()
+        res = cv2.matchTemplate(button.image, image, cv2.TM_CCOEFF_NORMED)
+        _, full, _, full_loc = cv2.minMaxLoc(res)
+        self.cost['full'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        fast, fast_loc = button._match_pyramid(image)
+        self.cost['pyramid'] += time.perf_counter() - start
+
+        for threshold in THRESHOLDS:
+            self.total += 1
+            appear = full > threshold
+            if appear != (fast > threshold) or (appear and tuple(full_loc) != tuple(fast_loc)):
+                self.mismatch.append((button.name, file, threshold, (full, full_loc), (fast, fast_loc)))
+
+    def run(self):
+        for index, button in enumerate(self.buttons):
+            if index % 50 == 0:
+                logger.info(f'Checking {index}/{len(self.buttons)}')
+            for file, image in self.screenshots(button):
+                self.check(button, file, image)
+
+        for row in self.mismatch:
+            logger.warning(f'Mismatch: {row}')
+        logger.attr('Checked', self.total)
+        logger.attr('Mismatch', len(self.mismatch))
+        logger.attr('Full', f'{round(self.cost["full"], 2)}s')
+        logger.attr('Pyramid', f'{round(self.cost["pyramid"], 2)}s')
+        return not self.mismatch
+
+
+if __name__ == '__main__':
+    sys.exit(0 if PyramidMatchCheck().run() else 1)
@@ -0,0 +1,71 @@
+import time
+
+import cv2
+import numpy as np
+
+from module.device.method.utils import Rgb565Decoder
+from module.logger import logger
+
+SHAPE = (1280, 720)
+TRIAL = 100
+
+
+def decode_legacy(arr):
+    """
+    RGB565 to RGB888 conversion used before Rgb565Decoder,
+    every plane is allocated for each frame.
+    """
+    r = cv2.bitwise_and(arr, 0b1111100000000000)
+    r = cv2.convertScaleAbs(r, alpha=0.00390625)
+    m = cv2.convertScaleAbs(r, alpha=0.03125)
+    cv2.add(r, m, dst=r)
+
+    g = cv2.bitwise_and(arr, 0b0000011111100000)
+    g = cv2.convertScaleAbs(g, alpha=0.125)
+    m = cv2.convertScaleAbs(g, alpha=0.015625, dst=m)
+    cv2.add(g, m, dst=g)
+
+    b = cv2.bitwise_and(arr, 0b0000000000011111)
+    b = cv2.convertScaleAbs(b, alpha=8)
+    m = cv2.convertScaleAbs(b, alpha=0.03125, dst=m)
+    cv2.add(b, m, dst=b)
+
+    return cv2.merge([r, g, b])
+
+
+def benchmark(func, data, trial=TRIAL):
+    """
+    Args:
+        func (callable): Receives raw bytes and returns RGB888 image
+        data (bytes):
+        trial (int):
+
+    Returns:
+        float: Average cost in ms
+    """
+    func(data)
+    start = time.perf_counter()
+    for _ in range(trial):
+        func(data)
+    return (time.perf_counter() - start) / trial * 1000
+
+
+if __name__ == '__main__':
+    data = np.random.randint(0, 65536, size=SHAPE, dtype=np.uint16).tobytes()
+    decoder = Rgb565Decoder(shape=SHAPE)
+
+    def legacy(raw):
+        return decode_legacy(np.frombuffer(raw, dtype=np.uint16).reshape(SHAPE))
+
+    def reuse(raw):
+        return decoder.decode(np.frombuffer(raw, dtype=np.uint16).reshape(SHAPE))
+
+    # Every possible RGB565 value
+    full = np.arange(65536, dtype=np.uint16).reshape((256, 256))
+    if np.array_equal(decode_legacy(full), Rgb565Decoder(shape=(256, 256)).decode(full)):
+        logger.info('Rgb565Decoder output is identical to legacy decoding')
+    else:
+        logger.critical('Rgb565Decoder output differs from legacy decoding')
+
+    logger.attr('Legacy', f'{round(benchmark(legacy, data), 3)}ms')
+    logger.attr('Rgb565Decoder', f'{round(benchmark(reuse, data), 3)}ms')
@@ -1,11 +1,11 @@
 import os
-import re
 import time
 from datetime import datetime, timedelta
 from functools import cached_property
 
 import inflection
 
+from module.base.profiler import Profiler
 from module.config.config import NikkeConfig, TaskEnd
 from module.config.utils import deep_get, deep_set
 from module.exception import (
@@ -22,6 +22,9 @@ from module.notify import handle_notify
 
 
 class NikkeAutoScript:
+    # (log_file, byte offset) where current task starts
+    task_log_start = (None, 0)
+
     def __init__(self, config_name="nkas"):
         logger.hr("Start", level=0)
         self.config_name = config_name
@@ -126,39 +129,44 @@ class NikkeAutoScript:
                 )
             exit(1)
 
+    @cached_property
+    def error_log_writer(self):
+        from module.handler.error_log import ErrorLogWriter
+
+        return ErrorLogWriter()
+
     def save_error_log(self):
         """
-        Save last 60 screenshots in ./log/error/<timestamp>
-        Save logs to ./log/error/<timestamp>/log.txt
+        Save recent screenshots in ./log/error/<timestamp>
+        Save logs of current task to ./log/error/<timestamp>/log.txt
+        Files are written in background, restart doesn't need to wait for them.
         """
-
-        from module.base.utils import save_image
-        from module.handler.sensitive_info import handle_sensitive_logs
-
         if not os.path.exists("./log/error"):
             os.mkdir("./log/error")
         folder = f"./log/error/{int(time.time() * 1000)}"
         logger.warning(f"Saving error: {folder}")
         os.mkdir(folder)
-        for data in self.device.screenshot_deque:
-            image_time = datetime.strftime(data["time"], "%Y-%m-%d_%H-%M-%S-%f")
-            # 遮挡个人消息
-            # image = handle_sensitive_image(data['image'])
-            image = data["image"]
-            save_image(image, f"{folder}/{image_time}.png")
-        with open(logger.log_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-            start = 0
-            for index, line in enumerate(lines):
-                line = line.strip(" \r\t\n")
-                # 从最后一个任务截取
-                if re.match("^═{15,}$", line):
-                    start = index
-            lines = lines[start - 2:]
-            # 替换真实路径
-            lines = handle_sensitive_logs(lines)
-        with open(f"{folder}/log.txt", "w", encoding="utf-8") as f:
-            f.writelines(lines)
+        # 从当前任务开始截取
+        log_file, log_start = self.task_log_start
+        if log_file != getattr(logger, "log_file", None):
+            log_start = 0
+        # 遮挡个人消息
+        # image = handle_sensitive_image(data['image'])
+        self.error_log_writer.save(
+            folder,
+            frames=self.device.screenshot_deque.snapshot(),
+            log_file=getattr(logger, "log_file", None),
+            log_start=log_start,
+        )
+
+    def task_log_start_record(self):
+        """
+        Record where current task starts in log file, error logs are cut from here.
+        """
+        try:
+            self.task_log_start = (logger.log_file, os.path.getsize(logger.log_file))
+        except (AttributeError, OSError):
+            self.task_log_start = (None, 0)
 
     def restart(self):
         from module.handler.login import LoginHandler
@@ -313,6 +321,9 @@ class NikkeAutoScript:
             bool: True if wait finished, False if config changed.
         """
         future = future + timedelta(seconds=1)
+        # No screenshots are needed during wait
+        if "device" in self.__dict__:
+            self.device.screenshot_method_release()
         """
             记录开始等待任务时，配置文件的最后更改时间
         """
@@ -423,6 +434,8 @@ class NikkeAutoScript:
             logger.info(f"Scheduler: Start task `{task}`")
             self.device.stuck_record_clear()
             self.device.click_record_clear()
+            self.task_log_start_record()
+            Profiler.reset()
             logger.hr(task, level=0)
             """
 
@@ -434,6 +447,7 @@ class NikkeAutoScript:
             """
 
             success = self.run(inflection.underscore(task))
+            Profiler.log_summary(f'Profiler {task}')
             logger.info(f"Scheduler: End task `{task}`")
             is_first = False
 
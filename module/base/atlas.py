@@ -0,0 +1,142 @@
+import json
+import os
+from functools import cached_property
+
+import numpy as np
+
+from module.logger import logger
+
+ATLAS_FOLDER = './bin/assets'
+ATLAS_DATA = 'atlas.bin'
+ATLAS_INDEX = 'atlas.json'
+# Templates are aligned in atlas.bin
+ATLAS_ALIGN = 64
+
+
+class AssetAtlas:
+    def __init__(self, folder=ATLAS_FOLDER):
+        """
+        Cropped templates of all assets packed into one file, built by dev_tools/asset_atlas.py.
+        Templates are read from a memory map, so loading is just slicing,
+        and pages are shared by all NKAS instances on the same machine.
+
+        Args:
+            folder (str):
+        """
+        self.folder = folder
+
+    @cached_property
+    def index(self):
+        """
+        Returns:
+            dict: key: AssetAtlas.key(), value: {'offset': int, 'shape': list, 'mtime': int, 'size': int}
+        """
+        file = os.path.join(self.folder, ATLAS_INDEX)
+        if not os.path.exists(file):
+            return {}
+        try:
+            with open(file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f'Failed to load asset atlas index: {e}')
+            return {}
+
+    @cached_property
+    def data(self):
+        """
+        Returns:
+            np.ndarray: Read only uint8 memory map, None if atlas not built.
+        """
+        file = os.path.join(self.folder, ATLAS_DATA)
+        if not self.index or not os.path.exists(file):
+            return None
+        try:
+            return np.memmap(file, dtype=np.uint8, mode='r')
+        except (OSError, ValueError) as e:
+            logger.warning(f'Failed to load asset atlas: {e}')
+            return None
+
+    @staticmethod
+    def key(file, area=None):
+        """
+        Args:
+            file (str): Asset file
+            area (tuple): Area to crop, None for the whole image
+
+        Returns:
+            str:
+        """
+        file = file.replace('\\', '/')
+        if area is None:
+            return file
+        return f'{file}:{",".join(str(int(v)) for v in area)}'
+
+    @staticmethod
+    def file_stat(file):
+        """
+        Returns:
+            tuple[int, int]: mtime in ns and size, to check if atlas is outdated.
+        """
+        stat = os.stat(file)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, file, area=None):
+        """
+        Args:
+            file (str): Asset file
+            area (tuple): Area to crop, None for the whole image
+
+        Returns:
+            np.ndarray: Read only template, same as load_image(file, area).
+                None if template is not in atlas or asset file has changed since atlas built.
+        """
+        data = self.data
+        if data is None:
+            return None
+        entry = self.index.get(self.key(file, area))
+        if entry is None:
+            return None
+        try:
+            if self.file_stat(file) != (entry['mtime'], entry['size']):
+                return None
+        except OSError:
+            return None
+
+        shape = tuple(entry['shape'])
+        offset = entry['offset']
+        return data[offset:offset + int(np.prod(shape))].reshape(shape).view(np.ndarray)
+
+    def build(self, items):
+        """
+        Args:
+            items (iterable[tuple[str, tuple, np.ndarray]]): file, area, and image loaded by load_image(file, area)
+
+        Returns:
+            int: Number of templates packed.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        index = {}
+        offset = 0
+        with open(os.path.join(self.folder, ATLAS_DATA), 'wb') as f:
+            for file, area, image in items:
+                key = self.key(file, area)
+                if key in index:
+                    continue
+                image = np.ascontiguousarray(image, dtype=np.uint8)
+                mtime, size = self.file_stat(file)
+                index[key] = {'offset': offset, 'shape': list(image.shape), 'mtime': mtime, 'size': size}
+                f.write(image.tobytes())
+                offset += image.nbytes
+                padding = -offset % ATLAS_ALIGN
+                f.write(b'\x00' * padding)
+                offset += padding
+
+        with open(os.path.join(self.folder, ATLAS_INDEX), 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=1)
+
+        self.__dict__.pop('index', None)
+        self.__dict__.pop('data', None)
+        return len(index)
+
+
+ASSET_ATLAS = AssetAtlas()
@@ -3,7 +3,7 @@ from functools import cached_property
 
 import numpy as np
 
-from module.base.button import Button
+from module.base.button import Button, match_first, match_parallel
 from module.base.timer import Timer
 from module.base.utils import float2str, point2str
 from module.config.config import NikkeConfig
@@ -54,7 +54,20 @@ class ModuleBase:
     def ocr_models(self):
         return OCR_MODEL
 
-    def appear(self, button: Button, offset=0, interval=0, threshold=None, static=True) -> bool:
+    def appear(self, button: Button, offset=0, interval=0, threshold=None, static=True, mode='color') -> bool:
+        """
+        Args:
+            button (Button):
+            offset (bool, int, tuple): 0 to check color only.
+            interval (int, float):
+            threshold (int, float):
+            static (bool): False to search the whole screenshot.
+            mode (str): Template matching on 'color', 'luma' or 'binary' images.
+                'luma' is about 3 times faster, use it on buttons that don't need color to be told apart.
+
+        Returns:
+            bool:
+        """
 
         self.device.stuck_record_add(button)
 
@@ -70,23 +83,107 @@ class ModuleBase:
         if offset:
             if isinstance(offset, bool):
                 offset = self.config.BUTTON_OFFSET
+            threshold = self.config.BUTTON_MATCH_SIMILARITY if not threshold else threshold
 
-            appear = button.match(self.device.image, offset=offset,
-                                  threshold=self.config.BUTTON_MATCH_SIMILARITY if not threshold else threshold,
-                                  static=static)
+            if self.config.SCREENSHOT_FRAME_CHANGE:
+                # Reuse result if the searched area didn't change since last check
+                appear = self.device.frame_change.match(button, self.device.frame, offset=offset,
+                                                        threshold=threshold, static=static, mode=mode)
+            else:
+                appear = button.match(self.device.frame, offset=offset, threshold=threshold, static=static,
+                                      mode=mode)
         else:
-            appear = button.appear_on(self.device.image,
-                                      threshold=self.config.COLOR_SIMILAR_THRESHOLD if not threshold else threshold)
+            threshold = self.config.COLOR_SIMILAR_THRESHOLD if not threshold else threshold
+
+            if self.config.SCREENSHOT_FRAME_CHANGE:
+                appear = self.device.frame_change.appear_on(button, self.device.frame, threshold=threshold)
+            else:
+                appear = button.appear_on(self.device.frame, threshold=threshold)
 
         if appear and interval:
             self.interval_timer[button.name].reset()
 
         return appear
 
+    def appear_any(self, buttons, offset=(30, 30), threshold=None):
+        """
+        Template match buttons on current screenshot in order, and stop at the first one that appears.
+        Faster than calling appear() on each button, as buttons searching the same area share one crop.
+
+        Args:
+            buttons (list[Button]):
+            offset (int, tuple):
+            threshold (float):
+
+        Returns:
+            Button: The first button that appears, or None.
+        """
+        for button in buttons:
+            self.device.stuck_record_add(button)
+
+        if isinstance(offset, bool):
+            offset = self.config.BUTTON_OFFSET
+        threshold = self.config.BUTTON_MATCH_SIMILARITY if not threshold else threshold
+
+        if self.config.SCREENSHOT_FRAME_CHANGE:
+            return self.device.frame_change.match_first(buttons, self.device.frame, offset=offset, threshold=threshold)
+        else:
+            return match_first(buttons, self.device.frame, offset=offset, threshold=threshold)
+
+    def appear_parallel(self, buttons, offset=(30, 30), threshold=None, static=True):
+        """
+        Template match buttons on current screenshot in worker threads.
+        Unlike appear_any(), all buttons are matched, use it when buttons are independent of each other.
+
+        Args:
+            buttons (list[Button]): Sorted by priority.
+            offset (int, tuple):
+            threshold (float):
+            static (bool):
+
+        Returns:
+            list[Button]: Buttons that appear, in the same order as input,
+                so the first one is the one to click.
+        """
+        # Same button twice would write results to one object from two threads
+        buttons = list(dict.fromkeys(buttons))
+        for button in buttons:
+            self.device.stuck_record_add(button)
+
+        if isinstance(offset, bool):
+            offset = self.config.BUTTON_OFFSET
+        threshold = self.config.BUTTON_MATCH_SIMILARITY if not threshold else threshold
+
+        if self.config.SCREENSHOT_FRAME_CHANGE:
+            appears = self.device.frame_change.match_parallel(
+                buttons, self.device.frame, offset=offset, threshold=threshold, static=static)
+        else:
+            appears = match_parallel(buttons, self.device.frame, offset=offset, threshold=threshold, static=static)
+        return [button for button, appear in zip(buttons, appears) if appear]
+
+    def appear_on_batch(self, buttons, threshold=None):
+        """
+        Color check buttons on current screenshot at once, same as calling appear(button) with offset=0 on each.
+        Average colors come from a summed-area table built once per screenshot,
+        faster than appear() when checking many buttons.
+
+        Args:
+            buttons (list[Button]):
+            threshold (int):
+
+        Returns:
+            list[bool]:
+        """
+        for button in buttons:
+            self.device.stuck_record_add(button)
+
+        threshold = self.config.COLOR_SIMILAR_THRESHOLD if not threshold else threshold
+        return self.device.color_checker.appear_on(buttons, threshold=threshold)
+
     def appear_then_click(self, button, offset=0, interval=0, threshold=None,
-                          static=True, screenshot=False) -> bool:
+                          static=True, screenshot=False, mode='color') -> bool:
 
-        appear = self.appear(button, offset=offset, interval=interval, threshold=threshold, static=static)
+        appear = self.appear(button, offset=offset, interval=interval, threshold=threshold, static=static, mode=mode)
         if appear:
             if screenshot:
                 self.device.sleep(self.config.WAIT_BEFORE_SAVING_SCREEN_SHOT)
@@ -95,7 +192,19 @@ class ModuleBase:
 
         return appear
 
-    def appear_text(self, text, interval=0, area=None, model='cnocr') -> bool or tuple:
+    def appear_text(self, text, interval=0, area=None, model='cnocr', rec_only=False) -> bool or tuple:
+        """
+        Args:
+            text (str):
+            interval (int, float):
+            area (tuple): Area to search text.
+            model (str):
+            rec_only (bool): True to skip text detection when area is tight around a single line of text,
+                location is then the center of area.
+
+        Returns:
+            bool, tuple: Location of text relative to area, or False.
+        """
         if interval:
             if text in self.interval_timer:
                 if self.interval_timer[text].limit != interval:
@@ -105,7 +214,8 @@ class ModuleBase:
             if not self.interval_timer[text].reached():
                 return False
 
-        res = self.ocr_models.__getattribute__(model).ocr(self.device.image, area=area)
+        res = self.ocr_models.__getattribute__(model).ocr(self.device.image, area=area,
+                                                              rec_only=bool(rec_only and area))
         location = self.device.get_location(text, res)
         if location:
             if interval:
@@ -177,8 +287,19 @@ class ModuleBase:
             self.device.swipe(x1, x2, handle_control_check=False)
             self.device.sleep(delay)
 
-    def ocr_area(self, image, area=None, model='cnocr'):
-        result = self.ocr_models.__getattribute__(model).ocr(image, area=area)
+    def ocr_area(self, image, area=None, model='cnocr', rec_only=False, split=False):
+        """
+        Args:
+            image (np.ndarray):
+            area (tuple):
+            model (str):
+            rec_only (bool): True to skip text detection, and recognize the whole area as one line.
+            split (bool): If rec_only, split lines by projection profile.
+
+        Returns:
+            list[dict]: OCR results with positions relative to image, or None.
+        """
+        result = self.ocr_models.__getattribute__(model).ocr(image, area=area, rec_only=rec_only, split=split)
         if len(result):
             if area:
                 # 添加区域偏移
@@ -1,15 +1,109 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from functools import cached_property
 
 import cv2
 import imageio
 import numpy as np
 
+from module.base.atlas import ASSET_ATLAS
+from module.base.profiler import Profiler
 from module.base.resource import Resource
-from module.base.utils import crop, load_image, area_offset, color_similar, get_color, mask_area, find_center
+from module.base.utils import crop, load_image, area_offset, color_similar, get_color, find_center, rgb2luma, \
+    rgb2binary
+
+
+class FrameMatchCache:
+    # Drop all results if too many are recorded on one screenshot
+    LIMIT = 512
+    # Functions to convert screenshot for each match mode
+    CONVERTERS = {
+        'luma': rgb2luma,
+        'binary': rgb2binary,
+    }
+
+    def __init__(self):
+        """
+        Results of Button.match() on the current screenshot,
+        so checking the same button again on the same screenshot doesn't run matchTemplate again.
+        Screenshot calls new_frame() on every new screenshot, which drops all results.
+        """
+        # Objects of the current screenshot, such as Rgb565Frame and the np.ndarray decoded from it
+        self.images = []
+        # key: (button, offset, threshold, static, pyramid, mode), value: (template, similarity, button_offset, frame)
+        self.results = {}
+        # key: match mode, value: converted screenshot
+        self.planes = {}
+
+    def new_frame(self, *images):
+        """
+        Args:
+            *images: Objects of the new screenshot.
+        """
+        self.images = [image for image in images if image is not None]
+        self.results = {}
+        self.planes = {}
+
+    def plane(self, image, mode):
+        """
+        Convert screenshot for luma and binary match modes, once per screenshot.
+
+        Args:
+            image (np.ndarray, Rgb565Frame): Screenshot.
+            mode (str): 'luma' or 'binary'
+
+        Returns:
+            np.ndarray:
+        """
+        convert = self.CONVERTERS[mode]
+        if not self.is_current(image):
+            return convert(np.asarray(image))
+        plane = self.planes.get(mode)
+        if plane is None:
+            plane = self.planes[mode] = convert(np.asarray(image))
+        return plane
+
+    def add_image(self, image):
+        """
+        Add another object of the current screenshot, such as the np.ndarray after decoding an Rgb565Frame.
+        """
+        if image is not None and not self.is_current(image):
+            self.images.append(image)
+
+    def is_current(self, image):
+        return any(image is current for current in self.images)
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def set(self, key, value):
+        if len(self.results) >= self.LIMIT:
+            self.results = {}
+        self.results[key] = value
+
+
+FRAME_MATCH_CACHE = FrameMatchCache()
 
 
 class Button(Resource):
+    # Pyramid matching, used by default when static=False and searching an image much larger than template
+    PYRAMID = True
+    # Search area should be N times larger than template
+    PYRAMID_MIN_RATIO = 16
+    # Downscale screenshot and template by this ratio to find candidates
+    PYRAMID_SCALE = 0.5
+    # Use full resolution matching if template is smaller than this after downscaling
+    PYRAMID_MIN_SIZE = 8
+    # Refine N best candidates at full resolution.
+    # Downscaled similarity can be much lower than the full resolution one on small templates,
+    # so candidates are chosen by rank instead of similarity.
+    PYRAMID_CANDIDATES = 5
+    # When static=False, search around the last found position first, and search the whole image on miss.
+    # Only on the current screenshot, positions found on crops of different areas can't be reused.
+    LOCALITY = True
+    # Pixels to search around the last found position
+    LOCALITY_MARGIN = 20
+
     def __init__(self, area, color, button, file=None, name=None):
         """Initialize a Button instance.
 
@@ -37,8 +131,17 @@ class Button(Resource):
         # 非模板位置，例如'确认'并不是固定的
         self._button_offset = None
         self._match_init = False
+        # (template, downscaled template)
+        self._pyramid = None
+        # Upper left of the last found position on screenshots when static=False
+        self._locality = None
+        # Similarity and frame index of the last match, frame index is always 0 if button is not a gif
+        self._match_similarity = 0.
+        self._match_frame = 0
         self._match_binary_init = False
         self._match_luma_init = False
+        # self.image that image_luma and image_binary are converted from
+        self._mode_source = None
         self.image = None
         self.image_binary = None
         self.image_luma = None
@@ -92,6 +195,46 @@ class Button(Resource):
     def __str__(self):
         return self.name
 
+    @property
+    def templates(self):
+        """
+        Returns:
+            list[np.ndarray]: Frames of a gif button, or a list of the only template.
+        """
+        if isinstance(self.image, list):
+            return self.image
+        else:
+            return [self.image]
+
+    def ensure_mode_templates(self):
+        """
+        Convert templates to luma and black and white, for match_luma() and match_binary().
+        Called when templates are loaded, and converts again if self.image is replaced, such as by load_color().
+        """
+        if self._match_luma_init and self._match_binary_init and self._mode_source is self.image:
+            return
+        templates = self.templates
+        self.image_luma = [rgb2luma(template) for template in templates]
+        self.image_binary = [rgb2binary(template) for template in templates]
+        self._mode_source = self.image
+        self._match_luma_init = True
+        self._match_binary_init = True
+
+    def mode_templates(self, mode='color'):
+        """
+        Args:
+            mode (str): 'color', 'luma' or 'binary'
+
+        Returns:
+            list[np.ndarray]: Templates, or frames of a gif button, in the given mode.
+        """
+        self.ensure_template()
+        if mode == 'luma':
+            return self.image_luma
+        if mode == 'binary':
+            return self.image_binary
+        return self.templates
+
     def ensure_template(self):
         """
         Load asset image.
@@ -105,55 +248,329 @@ class Button(Resource):
                     image = crop(image, self.area)
                     self.image.append(image)
             else:
-                self.image = load_image(self.file, self.area)
+                # Slice from the prebuilt atlas, see dev_tools/asset_atlas.py
+                self.image = ASSET_ATLAS.get(self.file, self.area)
+                if self.image is None:
+                    self.image = load_image(self.file, self.area)
             self._match_init = True
+        # Some tasks set self.image directly, convert templates of all modes once here
+        self.ensure_mode_templates()
 
-    def match(self, image, offset=30, threshold=0.85, static=True) -> bool:
-        self.ensure_template()
-        if static:
-            if isinstance(offset, tuple):
-                if len(offset) == 2:
-                    offset = np.array((-offset[0], -offset[1], offset[0], offset[1]))
-                else:
-                    offset = np.array(offset)
+    @staticmethod
+    def parse_offset(offset):
+        """
+        Args:
+            offset (int, tuple): (x, y) or (upper_left_x, upper_left_y, bottom_right_x, bottom_right_y)
+                If int, search (-3, -offset, 3, offset).
+
+        Returns:
+            np.ndarray: (upper_left_x, upper_left_y, bottom_right_x, bottom_right_y)
+        """
+        if isinstance(offset, tuple):
+            if len(offset) == 2:
+                return np.array((-offset[0], -offset[1], offset[0], offset[1]))
             else:
-                offset = np.array((-3, -offset, 3, offset))
+                return np.array(offset)
+        else:
+            return np.array((-3, -offset, 3, offset))
+
+    def search_area(self, offset=30):
+        """
+        Args:
+            offset (int, tuple):
+
+        Returns:
+            tuple: Area on screenshot that a static match reads.
+        """
+        return tuple(self.parse_offset(offset) + self.area)
+
+    @Profiler.timeit('Button.match')
+    def match(self, image, offset=30, threshold=0.85, static=True, pyramid=None, mode='color') -> bool:
+        """
+        Args:
+            image (np.ndarray, Rgb565Frame): Screenshot.
+            offset (int, tuple):
+            threshold (float):
+            static (bool): False to search the whole screenshot.
+            pyramid (bool): True to search downscaled screenshot first and refine candidates at full resolution,
+                only works when static=False and button is not a gif. None to use it if image is at least
+                PYRAMID_MIN_RATIO times larger than template and Button.PYRAMID is True.
+            mode (str): 'color', 'luma' or 'binary', see match_luma() and match_binary().
+
+        Returns:
+            bool:
+        """
+        return self._match_cached(image, offset=offset, threshold=threshold, static=static, pyramid=pyramid,
+                                  mode=mode)
+
+    @Profiler.timeit('Button.match_luma')
+    def match_luma(self, image, offset=30, threshold=0.85, static=True) -> bool:
+        """
+        Same as match(), but on luma, which is about 3 times faster.
+        Screenshot is converted once and shared by all buttons.
+        """
+        return self._match_cached(image, offset=offset, threshold=threshold, static=static, mode='luma')
+
+    @Profiler.timeit('Button.match_binary')
+    def match_binary(self, image, offset=30, threshold=0.85, static=True) -> bool:
+        """
+        Same as match(), but on black and white images.
+        Screenshot is converted once with Otsu's threshold of the whole screenshot and shared by all buttons.
+        """
+        return self._match_cached(image, offset=offset, threshold=threshold, static=static, mode='binary')
+
+    def _match_cached(self, image, offset=30, threshold=0.85, static=True, pyramid=None, mode='color') -> bool:
+        templates = self.mode_templates(mode)
+        if mode != 'color':
+            # Pyramid matching has color templates only
+            pyramid = False
+        cache = FRAME_MATCH_CACHE
+        if not cache.is_current(image):
+            if mode != 'color':
+                image = cache.plane(image, mode)
+            return self._match(image, offset=offset, threshold=threshold, static=static, pyramid=pyramid,
+                               templates=templates, locality=False)
+
+        key = (self, tuple(self.parse_offset(offset).tolist()), threshold, static, pyramid, mode)
+        result = cache.get(key)
+        # Template may be reloaded by load_color()
+        if result is not None and result[0] is self.image:
+            Profiler.hit('Button.frame_cache', True)
+            _, similarity, button_offset, frame = result
+            self._match_similarity, self._match_frame = similarity, frame
+            if button_offset is not None:
+                self._button_offset = button_offset
+            return button_offset is not None
+
+        Profiler.hit('Button.frame_cache', False)
+        if mode != 'color':
+            image = cache.plane(image, mode)
+        appear = self._match(image, offset=offset, threshold=threshold, static=static, pyramid=pyramid,
+                             templates=templates, locality=True)
+        cache.set(key, (self.image, self._match_similarity, self._button_offset if appear else None,
+                        self._match_frame))
+        return appear
+
+    def _match(self, image, offset=30, threshold=0.85, static=True, pyramid=None, templates=None,
+               locality=False) -> bool:
+        """
+        Args:
+            locality (bool): True if image is the current screenshot,
+                to search around the last found position first and remember the new one.
+        """
+        locality = locality and self.LOCALITY
+        if static:
+            offset = self.parse_offset(offset)
+            # matchTemplate doesn't write to image, no need to copy
+            image = crop(image, offset + self.area, copy=False)
+        else:
+            image = np.asarray(image)
+            if locality and self._locality is not None:
+                appear = self._match_locality(image, threshold=threshold, templates=templates)
+                Profiler.hit('Button.locality', appear)
+                if appear:
+                    return True
+            if pyramid is None:
+                h, w = self.templates[0].shape[:2]
+                pyramid = self.PYRAMID and image.shape[0] * image.shape[1] >= h * w * self.PYRAMID_MIN_RATIO
+
+        # Pyramid matching has one template only, gif buttons match all frames at full resolution
+        appear = self._match_cropped(image, offset=offset, threshold=threshold, static=static,
+                                     pyramid=bool(pyramid) and not static and not self.is_gif, templates=templates)
+        if appear and not static and locality:
+            self._locality = self._button_offset[:2]
+        return appear
+
+    def _match_locality(self, image, threshold=0.85, templates=None):
+        """
+        Search around the last found position.
+
+        Args:
+            image (np.ndarray): Screenshot.
+            threshold (float):
+            templates (list[np.ndarray]): Default to self.templates
+
+        Returns:
+            bool:
+        """
+        x, y = self._locality
+        h, w = self.templates[0].shape[:2]
+        height, width = image.shape[:2]
+        margin = self.LOCALITY_MARGIN
+        x1, y1 = max(x - margin, 0), max(y - margin, 0)
+        x2, y2 = min(x + w + margin, width), min(y + h + margin, height)
+        if x2 - x1 < w or y2 - y1 < h:
+            return False
+
+        similarity, (fx, fy), frame = self._match_frames(image[y1:y2, x1:x2], templates=templates)
+        if similarity > threshold:
+            self._match_similarity, self._match_frame = similarity, frame
+            self._button_offset = self._offset_button((x1 + fx, y1 + fy), offset=None, static=False)
+            return True
+        return False
 
-            image = crop(image, offset + self.area)
+    def _match_cropped(self, image, offset, threshold=0.85, static=True, pyramid=False, templates=None) -> bool:
+        """
+        Args:
+            image (np.ndarray): Search area cropped from screenshot if static, or the whole screenshot.
+            offset (np.ndarray): Parsed offset.
+            threshold (float):
+            static (bool):
+            pyramid (bool):
+            templates (list[np.ndarray]): Default to self.templates
 
-        res = cv2.matchTemplate(self.image, image, cv2.TM_CCOEFF_NORMED)
-        _, similarity, _, upper_left = cv2.minMaxLoc(res)
+        Returns:
+            bool:
+        """
+        if pyramid:
+            similarity, upper_left = self._match_pyramid(image)
+            frame = 0
+        else:
+            similarity, upper_left, frame = self._match_frames(image, templates=templates)
         # print(self.name, similarity)
+        self._match_similarity, self._match_frame = similarity, frame
 
         if similarity > threshold:
-            if static:
-                self._button_offset = area_offset(self._button, offset[:2] + np.array(upper_left))
-            else:
-                h, w = self.area[3] - self.area[1], self.area[2] - self.area[0]
-                bottom_right = (upper_left[0] + w, upper_left[1] + h)
-                self._button_offset = (upper_left[0], upper_left[1], bottom_right[0], bottom_right[1])
+            self._button_offset = self._offset_button(upper_left, offset=offset, static=static)
 
         return similarity > threshold
 
-        # if self.is_gif:
-        #     for template in self.image:
-        #         res = cv2.matchTemplate(template, image, cv2.TM_CCOEFF_NORMED)
-        #         _, similarity, _, point = cv2.minMaxLoc(res)
-        #         self._button_offset = area_offset(self._button, offset[:2] + np.array(point))
-        #         if similarity > threshold:
-        #             return True
-        #     return False
-        # else:
+    def _match_frames(self, image, templates=None):
+        """
+        Match all frames of a gif button on the same image, and take the best one.
+        Buttons that are not gifs have only one frame.
 
+        Args:
+            image (np.ndarray):
+            templates (list[np.ndarray]): Default to self.templates
+
+        Returns:
+            float, tuple, int: Similarity, upper left, and index of the best frame.
+        """
+        if templates is None:
+            templates = self.templates
+        best = (-1., (0, 0), 0)
+        for index, template in enumerate(templates):
+            res = cv2.matchTemplate(template, image, cv2.TM_CCOEFF_NORMED)
+            _, similarity, _, upper_left = cv2.minMaxLoc(res)
+            if similarity > best[0]:
+                best = (similarity, upper_left, index)
+        return best
+
+    def _pyramid_template(self):
+        """
+        Returns:
+            np.ndarray: Downscaled template, None if template is too small.
+        """
+        if self._pyramid is None or self._pyramid[0] is not self.image:
+            h, w = self.image.shape[:2]
+            size = (round(w * self.PYRAMID_SCALE), round(h * self.PYRAMID_SCALE))
+            if min(size) < self.PYRAMID_MIN_SIZE:
+                small = None
+            else:
+                small = cv2.resize(self.image, size, interpolation=cv2.INTER_AREA)
+            self._pyramid = (self.image, small)
+        return self._pyramid[1]
+
+    def _match_pyramid(self, image):
+        """
+        Coarse to fine template matching.
+        Candidates are found on downscaled screenshot, then matched at full resolution in small windows around them.
+        Similarity at a refined location is exactly the same as full resolution matching,
+        so results are the same as long as the best location is one of the candidates.
+
+        Args:
+            image (np.ndarray): Screenshot.
+
+        Returns:
+            float, tuple: Similarity and upper left of the best location.
+        """
+        small = self._pyramid_template()
+        if small is None:
+            res = cv2.matchTemplate(self.image, image, cv2.TM_CCOEFF_NORMED)
+            _, similarity, _, upper_left = cv2.minMaxLoc(res)
+            return similarity, upper_left
+
+        scale = self.PYRAMID_SCALE
+        height, width = image.shape[:2]
+        image_small = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+        res = cv2.matchTemplate(small, image_small, cv2.TM_CCOEFF_NORMED)
+
+        h, w = self.image.shape[:2]
+        sh, sw = small.shape[:2]
+        # Candidates may move by about 1 / scale pixels after rounding
+        radius = int(np.ceil(1 / scale)) + 1
+        best = (-1., (0, 0))
+        for _ in range(self.PYRAMID_CANDIDATES):
+            _, coarse, _, (cx, cy) = cv2.minMaxLoc(res)
+            if coarse <= -1:
+                break
+            # Suppress this peak
+            res[max(cy - sh // 2, 0):cy + sh // 2 + 1, max(cx - sw // 2, 0):cx + sw // 2 + 1] = -1
+
+            x, y = round(cx / scale), round(cy / scale)
+            x1, y1 = min(max(x - radius, 0), width - w), min(max(y - radius, 0), height - h)
+            x2, y2 = min(x + radius + w, width), min(y + radius + h, height)
+            fine = cv2.matchTemplate(self.image, image[y1:y2, x1:x2], cv2.TM_CCOEFF_NORMED)
+            _, similarity, _, (fx, fy) = cv2.minMaxLoc(fine)
+            if similarity > best[0]:
+                best = (similarity, (x1 + fx, y1 + fy))
+
+        return best
+
+    def _offset_button(self, upper_left, offset, static=True):
+        """
+        Args:
+            upper_left (tuple): Upper left of the matched template in the searched image.
+            offset (np.ndarray): Parsed offset.
+            static (bool):
+
+        Returns:
+            tuple: Button area after moving to the matched position.
+        """
+        if static:
+            return area_offset(self._button, offset[:2] + np.array(upper_left))
+        else:
+            h, w = self.area[3] - self.area[1], self.area[2] - self.area[0]
+            bottom_right = (upper_left[0] + w, upper_left[1] + h)
+            return upper_left[0], upper_left[1], bottom_right[0], bottom_right[1]
+
+    @Profiler.timeit('Button.match_several')
     def match_several(self, image, offset=30, threshold=0.85, static=True) -> list[dict]:
-        # areas = set()
+        """
+        Find all the places where button appears, with a single matchTemplate and non-maximum suppression.
+
+        Args:
+            image (np.ndarray, Rgb565Frame): Screenshot.
+            offset (int, tuple):
+            threshold (float):
+            static (bool): False to search the whole screenshot.
+
+        Returns:
+            list[dict]: {'area': tuple, 'location': tuple}, sorted by similarity, the best first.
+        """
+        self.ensure_template()
+        offset = self.parse_offset(offset)
+        if static:
+            image = crop(image, offset + self.area, copy=False)
+        else:
+            image = np.asarray(image)
+
+        res = None
+        for template in self.templates:
+            frame_res = cv2.matchTemplate(template, image, cv2.TM_CCOEFF_NORMED)
+            # Best similarity of all frames at each position
+            res = frame_res if res is None else np.maximum(res, frame_res, out=res)
+        h, w = self.templates[0].shape[:2]
         areas = []
         while 1:
-            if self.match(image, offset=offset, threshold=threshold, static=static):
-                areas.append({'area': self._button_offset, 'location': self.location})
-                image = mask_area(image, self._button_offset)
-            else:
+            _, similarity, _, (x, y) = cv2.minMaxLoc(res)
+            if similarity <= threshold:
                 return areas
+            self._button_offset = self._offset_button((x, y), offset=offset, static=static)
+            areas.append({'area': self._button_offset, 'location': self.location})
+            # Suppress all positions that overlap the found one
+            res[max(y - h + 1, 0):y + h, max(x - w + 1, 0):x + w] = -1
 
     def appear_on(self, image, threshold=10) -> bool:
         """Check if the button appears on the image.
@@ -197,6 +614,7 @@ class Button(Resource):
         self.__dict__['color'] = get_color(image, self.area)
         self.image = crop(image, self.area)
         self.__dict__['is_gif'] = False
+        self.ensure_mode_templates()
         return self.color
 
     def load_offset(self, button):
@@ -249,4 +667,99 @@ class Button(Resource):
         button = Button(area=new_area, color=self.color, button=new_button, file=self.file, name=name)
         if image is not None:
             button.load_color(image)
-        return button
\ No newline at end of file
+        return button
+
+
+@Profiler.timeit('Button.match_first')
+def match_first(buttons, image, offset=30, threshold=0.85, crops=None):
+    """
+    Match buttons on the same screenshot in order, and stop at the first one that appears.
+    Buttons searching the same area share one crop, and crops are views of screenshot without copying.
+
+    Args:
+        buttons (list[Button]):
+        image (np.ndarray, Rgb565Frame): Screenshot.
+        offset (int, tuple):
+        threshold (float):
+        crops (dict): Crops to share between calls on the same screenshot.
+            key: search area, value: np.ndarray
+
+    Returns:
+        Button: The first button that appears, or None.
+    """
+    offset = Button.parse_offset(offset)
+    if crops is None:
+        crops = {}
+    for button in buttons:
+        button.ensure_template()
+        area = tuple(offset + button.area)
+        search = crops.get(area)
+        if search is None:
+            search = crops[area] = crop(image, area, copy=False)
+        if button._match_cropped(search, offset=offset, threshold=threshold, static=True):
+            return button
+    return None
+
+
+class MatchPool:
+    # cv2.matchTemplate() releases GIL, a few threads are enough to keep idle cores busy
+    WORKERS = min(4, os.cpu_count() or 1)
+
+    def __init__(self, workers=WORKERS):
+        """
+        Worker threads shared by all parallel matches in this process.
+
+        Args:
+            workers (int):
+        """
+        self.workers = workers
+
+    @cached_property
+    def executor(self):
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ButtonMatch')
+
+    def map(self, func, items):
+        """
+        Args:
+            func (callable):
+            items (list):
+
+        Returns:
+            list: Results in the same order as items.
+        """
+        if len(items) <= 1 or self.workers <= 1:
+            return [func(item) for item in items]
+        return list(self.executor.map(func, items))
+
+
+MATCH_POOL = MatchPool()
+
+
+@Profiler.timeit('Button.match_parallel')
+def match_parallel(buttons, image, offset=30, threshold=0.85, static=True):
+    """
+    Match buttons on the same screenshot in worker threads.
+    Unlike match_first(), all buttons are matched.
+
+    Args:
+        buttons (list[Button]): Should not contain the same button twice,
+            as results are written back to the button object.
+        image (np.ndarray, Rgb565Frame): Screenshot.
+        offset (int, tuple):
+        threshold (float):
+        static (bool):
+
+    Returns:
+        list[bool]: If each button appears, in the same order as buttons.
+    """
+    # Load templates in current thread, workers do matching only
+    for button in buttons:
+        button.ensure_template()
+    if not isinstance(image, np.ndarray) and len(buttons) > 1:
+        # Decode lazy frames in current thread, Rgb565Frame shares one decoder and is not thread safe
+        decoded = np.asarray(image)
+        if FRAME_MATCH_CACHE.is_current(image):
+            FRAME_MATCH_CACHE.add_image(decoded)
+        image = decoded
+    return MATCH_POOL.map(
+        lambda button: button.match(image, offset=offset, threshold=threshold, static=static), buttons)
@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+
+
+class ColorChecker:
+    def __init__(self, image):
+        """
+        Average colors of any area on a screenshot in O(1), using a summed-area table.
+        Building it costs about one full screenshot pass, so use it when checking many buttons on the same screenshot.
+
+        Args:
+            image (np.ndarray, Rgb565Frame): Screenshot.
+        """
+        image = np.asarray(image)
+        self.height, self.width = image.shape[:2]
+        # Shape (height + 1, width + 1, channel), int32 is enough for 255 * 1280 * 720
+        self.integral = cv2.integral(image)
+        if self.integral.ndim == 2:
+            self.integral = self.integral[:, :, np.newaxis]
+
+    def get_colors(self, areas):
+        """
+        Same as module.base.utils.get_color(), but on many areas at once.
+        Areas outside of image are considered black, just like crop().
+
+        Args:
+            areas (list[tuple], np.ndarray): (upper_left_x, upper_left_y, bottom_right_x, bottom_right_y)
+
+        Returns:
+            np.ndarray: Shape (n, 3), average (r, g, b) of each area.
+        """
+        areas = np.round(np.asarray(areas, dtype=float).reshape(-1, 4)).astype(int)
+        x1, y1, x2, y2 = areas.T
+        size = (x2 - x1) * (y2 - y1)
+        x1, x2 = np.clip(x1, 0, self.width), np.clip(x2, 0, self.width)
+        y1, y2 = np.clip(y1, 0, self.height), np.clip(y2, 0, self.height)
+
+        integral = self.integral
+        total = integral[y2, x2].astype(np.int64) - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+        colors = np.zeros(total.shape, dtype=float)
+        np.divide(total, size[:, np.newaxis], out=colors, where=size[:, np.newaxis] > 0)
+        return colors[:, :3]
+
+    def color_similar(self, areas, colors, threshold=10):
+        """
+        Same as module.base.utils.color_similar(get_color(image, area), color, threshold), but on many areas at once.
+
+        Args:
+            areas (list[tuple]):
+            colors (list[tuple]): Expected (r, g, b) of each area.
+            threshold (int, list[int]):
+
+        Returns:
+            np.ndarray: Shape (n,), bool.
+        """
+        diff = self.get_colors(areas).astype(int) - np.asarray(colors, dtype=float).reshape(-1, 3).astype(int)
+        diff = np.max(np.maximum(diff, 0), axis=1) - np.min(np.minimum(diff, 0), axis=1)
+        return diff <= np.asarray(threshold)
+
+    def appear_on(self, buttons, threshold=10):
+        """
+        Same as Button.appear_on() on many buttons at once.
+
+        Args:
+            buttons (list[Button]):
+            threshold (int):
+
+        Returns:
+            list[bool]:
+        """
+        if not buttons:
+            return []
+        areas = [button.area for button in buttons]
+        colors = [button.color for button in buttons]
+        return self.color_similar(areas, colors, threshold=threshold).tolist()
@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+import numpy as np
+
+
+class LatencyStat:
+    def __init__(self, window=1000):
+        """
+        Rolling record of time costs.
+
+        Args:
+            window (int): Keep the latest N records for percentiles
+        """
+        self.costs = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.
+
+    def add(self, cost):
+        """
+        Args:
+            cost (float): Time cost in seconds
+        """
+        self.costs.append(cost)
+        self.count += 1
+        self.total += cost
+
+    def percentile(self, q):
+        """
+        Args:
+            q (int, float): 0 to 100
+
+        Returns:
+            float: Time cost in seconds
+        """
+        if not self.costs:
+            return 0.
+        return float(np.percentile(self.costs, q))
+
+    @property
+    def p50(self):
+        return self.percentile(50)
+
+    @property
+    def p95(self):
+        return self.percentile(95)
+
+    @property
+    def max(self):
+        return max(self.costs) if self.costs else 0.
+
+
+class Profiler:
+    """
+    Time costs of hot paths, such as screenshot, decode, template matching, OCR and click.
+
+    Examples:
+        @Profiler.timeit('Button.match')
+        def match(self, image, offset=30, threshold=0.85, static=True):
+            pass
+
+        Profiler.reset()
+        ...
+        Profiler.log_summary()
+    """
+    # Records kept for percentiles of each name
+    WINDOW = 1000
+    # key: name, value: LatencyStat
+    stats = {}
+    # key: name, value: [hit, total]
+    hits = {}
+    # Records are added from background threads, such as DroidCast stream and match workers
+    lock = threading.Lock()
+
+    @classmethod
+    def add(cls, name, cost):
+        """
+        Args:
+            name (str):
+            cost (float): Time cost in seconds
+        """
+        with cls.lock:
+            stat = cls.stats.get(name)
+            if stat is None:
+                stat = cls.stats[name] = LatencyStat(window=cls.WINDOW)
+            stat.add(cost)
+
+    @classmethod
+    def hit(cls, name, hit):
+        """
+        Record a cache hit or miss.
+
+        Args:
+            name (str):
+            hit (bool):
+        """
+        with cls.lock:
+            record = cls.hits.get(name)
+            if record is None:
+                record = cls.hits[name] = [0, 0]
+            record[0] += bool(hit)
+            record[1] += 1
+
+    @classmethod
+    def timeit(cls, name):
+        """
+        Decorator to record time cost of a function.
+
+        Args:
+            name (str):
+        """
+
+        def decorate(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    cls.add(name, time.perf_counter() - start)
+
+            return wrapper
+
+        return decorate
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.stats = {}
+            cls.hits = {}
+
+    @classmethod
+    def summary(cls):
+        """
+        Returns:
+            list[dict]: name, count, total, p50, p95, max. Time costs are in ms.
+        """
+        with cls.lock:
+            rows = []
+            for name, stat in cls.stats.items():
+                rows.append({
+                    'name': name,
+                    'count': stat.count,
+                    'total': stat.total * 1000,
+                    'p50': stat.p50 * 1000,
+                    'p95': stat.p95 * 1000,
+                    'max': stat.max * 1000,
+                })
+        return rows
+
+    @classmethod
+    def hit_summary(cls):
+        """
+        Returns:
+            dict: key: name, value: (hit, total)
+        """
+        with cls.lock:
+            return {name: tuple(record) for name, record in cls.hits.items()}
+
+    @classmethod
+    def log_summary(cls, title='Profiler'):
+        from module.logger import logger
+        rows = cls.summary()
+        hits = cls.hit_summary()
+        if not rows and not hits:
+            return
+        logger.hr(title, level=2)
+        for row in rows:
+            logger.attr(
+                row['name'],
+                f'count={row["count"]}, total={row["total"]:.0f}ms, '
+                f'p50={row["p50"]:.1f}ms, p95={row["p95"]:.1f}ms, max={row["max"]:.1f}ms'
+            )
+        for name, (hit, total) in hits.items():
+            logger.attr(name, f'hit={hit}/{total} ({hit / total:.0%})')
@@ -2,7 +2,8 @@ import os
 
 import imageio
 
-from module.base.button import Button
+from module.base.atlas import ASSET_ATLAS
+from module.base.button import Button, FRAME_MATCH_CACHE
 from functools import cached_property
 from module.base.resource import Resource
 from module.base.utils import *
@@ -54,7 +55,10 @@ class Template(Resource):
                     image = self.pre_process(image)
                     self._image += [image, cv2.flip(image, 1)]
             else:
-                self._image = self.pre_process(load_image(self.file))
+                image = ASSET_ATLAS.get(self.file)
+                if image is None:
+                    image = load_image(self.file)
+                self._image = self.pre_process(image)
 
         return self._image
 
@@ -62,14 +66,9 @@ class Template(Resource):
     def image_binary(self):
         if self._image_binary is None:
             if self.is_gif:
-                self._image_binary = []
-                for image in self.image:
-                    image_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                    _, image_binary = cv2.threshold(image_gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-                    self._image_binary.append(image_binary)
+                self._image_binary = [rgb2binary(image) for image in self.image]
             else:
-                image_gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
-                _, self._image_binary = cv2.threshold(image_gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+                self._image_binary = rgb2binary(self.image)
 
         return self._image_binary
 
@@ -140,11 +139,9 @@ class Template(Resource):
         Returns:
             bool: If matches.
         """
+        # Screenshot is binarized once and shared by all templates
+        image_binary = FRAME_MATCH_CACHE.plane(image, 'binary')
         if self.is_gif:
-            # graying
-            image_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            # binarization
-            _, image_binary = cv2.threshold(image_gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
             for template in self.image_binary:
                 # template matching
                 res = cv2.matchTemplate(template, image_binary, cv2.TM_CCOEFF_NORMED)
@@ -156,10 +153,6 @@ class Template(Resource):
             return False
 
         else:
-            # graying
-            image_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            # binarization
-            _, image_binary = cv2.threshold(image_gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
             # template matching
             res = cv2.matchTemplate(self.image_binary, image_binary, cv2.TM_CCOEFF_NORMED)
             _, sim, _, _ = cv2.minMaxLoc(res)
@@ -176,7 +176,7 @@ def get_bbox(image, threshold=0):
     return x[0], y[0], x[-1] + 1, y[-1] + 1
 
 
-def crop(image, area):
+def crop(image, area, copy=True):
     """
     Crop image like pillow, when using opencv / numpy.
     Provides a black background if cropping outside of image.
@@ -184,15 +184,22 @@ def crop(image, area):
     Args:
         image (np.ndarray):
         area: (upper_left_x, upper_left_y, bottom_right_x, bottom_right_y)
+        copy (bool): False to return a view of image if area is inside image,
+            only use it when the result is read only, such as cv2.matchTemplate().
 
     Returns:
         np.ndarray:
     """
+    if not isinstance(image, np.ndarray):
+        # Lazy screenshot, such as Rgb565Frame, decodes only the rows inside area
+        return image.crop(area, copy=copy)
     x1, y1, x2, y2 = map(int, map(round, area))
     h, w = image.shape[:2]
     border = np.maximum((0 - y1, y2 - h, 0 - x1, x2 - w), 0)
     x1, y1, x2, y2 = np.maximum((x1, y1, x2, y2), 0)
-    image = image[y1:y2, x1:x2].copy()
+    image = image[y1:y2, x1:x2]
+    if copy or sum(border) > 0:
+        image = image.copy()
     if sum(border) > 0:
         image = cv2.copyMakeBorder(image, *border, borderType=cv2.BORDER_CONSTANT, value=(0, 0, 0))
     return image
@@ -213,6 +220,35 @@ def get_color(image, area):
     return color[:3]
 
 
+def rgb2luma(image):
+    """
+    Convert RGB to luma, the Y channel of YUV.
+
+    Args:
+        image (np.ndarray): Shape (height, width, channel)
+
+    Returns:
+        np.ndarray: Shape (height, width)
+    """
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+
+def rgb2binary(image):
+    """
+    Convert RGB to black and white, using Otsu's threshold of the whole image.
+
+    Args:
+        image (np.ndarray): Shape (height, width, channel)
+
+    Returns:
+        np.ndarray: Shape (height, width), 0 or 255
+    """
+    _, image = cv2.threshold(rgb2luma(image), 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return image
+
+
 def area_offset(area, offset):
     """
 
@@ -20,10 +20,11 @@ class GeneratedConfig:
     # Group `Emulator`
     Emulator_Serial = 'auto'
     Emulator_PackageName = 'com_proximabeta_nikke'  # com_proximabeta_nikke, com_gamamobi_nikke
-    Emulator_ScreenshotMethod = 'DroidCast'  # DroidCast
+    Emulator_ScreenshotMethod = 'DroidCast'  # auto, DroidCast, DroidCast_stream, DroidCast_websocket, ADB
     Emulator_ControlMethod = 'minitouch'  # minitouch
     Emulator_AdbRestart = False
     Emulator_ScreenshotInterval = 0.5
+    Emulator_AdaptiveScreenshotInterval = False
 
     # Group `Optimization`
     Optimization_AutoRedCircle = False
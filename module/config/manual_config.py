@@ -69,14 +69,37 @@ class ManualConfig:
 
     WAIT_BEFORE_SAVING_SCREEN_SHOT = 1
 
+    # Emulator.AdaptiveScreenshotInterval
+    # Slowest screenshot interval while screen stays the same, the fastest one is Emulator.ScreenshotInterval
+    SCREENSHOT_INTERVAL_ADAPTIVE_MAX = 1.5
+    SCREENSHOT_INTERVAL_ADAPTIVE_BACKOFF = 1.5
+    # Slow down after how many unchanged screenshots
+    SCREENSHOT_INTERVAL_ADAPTIVE_STABLE_COUNT = 2
+
+    # Emulator.ScreenshotMethod = auto
+    # Screenshots taken from each method when benchmarking, the first one is not counted as it includes initialization
+    SCREENSHOT_BENCHMARK_TRIAL = 5
+
+    # Results of ModuleBase.appear() are reused if tiles of button area didn't change since last check
+    SCREENSHOT_FRAME_CHANGE = True
+    # Tile size of frame change detection, should be a divisor of 720 and 1280
+    SCREENSHOT_FRAME_CHANGE_TILE = 40
+
     ASSETS_FOLDER = "./assets"
 
     DROIDCAST_FILEPATH_LOCAL = "./bin/DroidCast/DroidCast_raw-release-1.0.apk"
     DROIDCAST_FILEPATH_REMOTE = "/data/local/tmp/DroidCast_raw.apk"
 
+    # DroidCastS, used by screenshot method `DroidCast_websocket`
     DROIDCAST_RAW_FILEPATH_LOCAL = "./bin/DroidCast/DroidCastS-release-1.1.5.apk"
     DROIDCAST_RAW_FILEPATH_REMOTE = "/data/local/tmp/DroidCastS.apk"
 
+    # Screenshot method `DroidCast_stream`
+    # Minimum interval between two frames pulled by the background thread
+    DROIDCAST_STREAM_INTERVAL = 0.1
+    # Frames to keep in the ring buffer, only the newest one will be used
+    DROIDCAST_STREAM_LENGTH = 2
+
     EVENTS = [
         {
             "event_id": "event_20250612",
@@ -86,7 +109,8 @@ class ManualConfig:
         },
     ]
 
-    Error_ScreenshotLength = 1
+    # Max bytes of recent screenshots to keep for error logs, stored in RGB565, about 1.8MB each
+    Error_ScreenshotBudget = 4 * 1024 * 1024
 
     @property
     def SERVER(self):
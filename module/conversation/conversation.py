@@ -17,7 +17,7 @@ from module.logger import logger
 from module.ui.assets import CONVERSATION_CHECK, GOTO_BACK
 from module.ui.page import page_conversation
 from module.ui.ui import UI
-from module.ocr.ocr import Ocr
+from module.ocr.ocr import Ocr, OcrCollector
 
 class ChooseNextNIKKETooLong(Exception):
     pass
@@ -51,7 +51,15 @@ class Conversation(UI):
         
         return NIKKE_NAME.ocr(self.device.image)
 
-    def answer_text(self, button: Button) -> str:
+    def answer_text(self, button: Button, collector: OcrCollector = None):
+        """
+        Args:
+            button (Button):
+            collector (OcrCollector): Collect OCR to run in batch, returns OcrPending instead.
+
+        Returns:
+            str, OcrPending:
+        """
         area =_area_offset(button.area, (45, -13, 545, 13))
         ANSWER = Ocr(
             [area],
@@ -60,7 +68,9 @@ class Conversation(UI):
             threshold=128,
             lang="nikke",
         )
-        
+
+        if collector is not None:
+            return collector.add(ANSWER, self.device.image)
         return ANSWER.ocr(self.device.image)
     
     def get_next_target(self, skip_first_screenshot=True):
@@ -209,7 +219,9 @@ class Conversation(UI):
                 answers = TEMPLATE_ANSWER_CHECK.match_multi(self.device.image, similarity=0.9)
                 if len(answers) > 1:
                     # 提取选项文本
-                    answer_list = [self.answer_text(answer) for answer in answers]
+                    collector = OcrCollector()
+                    answer_list = [self.answer_text(answer, collector=collector) for answer in answers]
+                    answer_list = [pending.result() for pending in answer_list]
                     
                     # 获取正确答案
                     dialogue = Dialogue("./module/conversation/dialogue.json")
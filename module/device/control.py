@@ -3,6 +3,7 @@ from functools import cached_property
 import numpy as np
 
 from module.base.button import Button
+from module.base.profiler import Profiler
 from module.base.utils import ensure_int, point2str
 from module.device.method.minitouch import Minitouch
 from module.logger import logger
@@ -19,6 +20,7 @@ class Control(Minitouch):
             'minitouch': self.click_minitouch,
         }
 
+    @Profiler.timeit('Control.click')
     def click(self, button: Button, control_check=True):
         """Method to click a button.
 
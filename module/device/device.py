@@ -36,11 +36,11 @@ class Device(Screenshot, Control, AppControl):
             截图
 
             Returns:
-                np.ndarray:
+                np.ndarray, Rgb565Frame: Use self.image to get the decoded np.ndarray
         """
         self.stuck_record_check()
         super().screenshot()
-        return self.image
+        return self.frame
 
     def handle_control_check(self, button: Button):
         """
@@ -52,6 +52,13 @@ class Device(Screenshot, Control, AppControl):
         self.stuck_record_clear()
         self.click_record_add(button)
         self.click_record_check()
+        self.screenshot_interval_reset()
+
+    def handle_control_sent(self):
+        """
+            操作发送到设备后，丢弃操作前拉取的截图，避免下次截图拿到操作前的画面
+        """
+        self.droidcast_stream_invalidate()
 
     def click_record_check(self):
         """
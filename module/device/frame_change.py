@@ -0,0 +1,214 @@
+import cv2
+import numpy as np
+
+from module.base.button import Button, match_first, match_parallel
+
+
+class FrameChangeDetector:
+    # Drop all cached results if too many buttons are recorded,
+    # buttons created by Button.crop() and Button.move() are new objects every time.
+    CACHE_LIMIT = 512
+
+    def __init__(self, tile=40):
+        """
+        Track which tiles of the screenshot changed,
+        so results of Button.match() and Button.appear_on() can be reused while their area stays the same.
+
+        Args:
+            tile (int): Tile size in pixels. Screenshot width and height should be divisible by it,
+                otherwise the whole screenshot is considered changed every time.
+        """
+        self.tile = tile
+        self.frame_id = 0
+        # Frame waiting to be compared
+        self._pending = None
+        # The last compared frame, RGB565 bitmap or RGB888 image
+        self._reference = None
+        # Frame id when each tile changed last time
+        self._changed_at = None
+        # key: (frame_id, template, color, result)
+        self._cache = {}
+
+    def new_frame(self, frame):
+        """
+        Args:
+            frame (np.ndarray, Rgb565Frame):
+        """
+        self.frame_id += 1
+        self._pending = frame
+
+    @staticmethod
+    def _pixels(frame):
+        if isinstance(frame, np.ndarray):
+            return frame
+        # Compare Rgb565Frame in RGB565, without decoding
+        return getattr(frame, 'raw', None)
+
+    def _update(self):
+        """
+        Compare pending frame with the reference, and record changed tiles.
+        Only called when results are queried, so frames that nobody checks cost nothing.
+        """
+        if self._pending is None:
+            return
+        current = self._pixels(self._pending)
+        self._pending = None
+        reference, self._reference = self._reference, current
+
+        if current is None:
+            self._changed_at = None
+            return
+        height, width = current.shape[:2]
+        rows, cols = height // self.tile, width // self.tile
+        if rows * self.tile != height or cols * self.tile != width:
+            self._changed_at = None
+            return
+        if self._changed_at is None or self._changed_at.shape != (rows, cols) \
+                or reference is None or reference.shape != current.shape or reference.dtype != current.dtype:
+            self._changed_at = np.full((rows, cols), self.frame_id, dtype=np.int64)
+            return
+
+        diff = cv2.absdiff(reference, current).reshape(rows, self.tile, cols, -1)
+        changed = diff.max(axis=(1, 3)) > 0
+        self._changed_at[changed] = self.frame_id
+
+    def changed(self):
+        """
+        Returns:
+            bool: If current frame is different from the previous compared one.
+        """
+        self._update()
+        if self._changed_at is None:
+            return True
+        return bool((self._changed_at == self.frame_id).any())
+
+    def unchanged(self, area, since):
+        """
+        Args:
+            area (tuple): (upper_left_x, upper_left_y, bottom_right_x, bottom_right_y), None for the whole screenshot.
+            since (int): Frame id.
+
+        Returns:
+            bool: If all tiles inside area stay the same after the given frame.
+        """
+        if self._changed_at is None:
+            return False
+        if area is None:
+            tiles = self._changed_at
+        else:
+            rows, cols = self._changed_at.shape
+            x1, y1, x2, y2 = map(int, map(round, area))
+            x1, y1 = max(x1 // self.tile, 0), max(y1 // self.tile, 0)
+            x2, y2 = min(-(-x2 // self.tile), cols), min(-(-y2 // self.tile), rows)
+            if x1 >= x2 or y1 >= y2:
+                return True
+            tiles = self._changed_at[y1:y2, x1:x2]
+        return tiles.max() <= since
+
+    def _get(self, key, area, button):
+        self._update()
+        record = self._cache.get(key)
+        if record is None:
+            return None
+        frame_id, template, color, result = record
+        # Template or color may be reloaded by Button.load_color()
+        if template is not button.image or color != button.color:
+            return None
+        if frame_id != self.frame_id and not self.unchanged(area, since=frame_id):
+            return None
+        return result
+
+    def _set(self, key, button, result):
+        if len(self._cache) >= self.CACHE_LIMIT:
+            self._cache.clear()
+        self._cache[key] = (self.frame_id, button.image, button.color, result)
+
+    def match(self, button: Button, image, offset=30, threshold=0.85, static=True, mode='color') -> bool:
+        """
+        Same as Button.match(), but reuses the result if the searched area didn't change.
+        """
+        if isinstance(offset, (list, np.ndarray)):
+            offset = tuple(offset)
+        area = button.search_area(offset) if static else None
+        # Results of color matching are shared with match_first() and match_parallel()
+        kind = 'match' if mode == 'color' else f'match_{mode}'
+        key = (button, kind, offset, threshold, static)
+
+        result = self._get(key, area, button)
+        if result is not None:
+            appear, button_offset = result
+            if appear:
+                button._button_offset = button_offset
+            return appear
+
+        appear = button.match(image, offset=offset, threshold=threshold, static=static, mode=mode)
+        self._set(key, button, (appear, button._button_offset))
+        return appear
+
+    def match_first(self, buttons, image, offset=30, threshold=0.85):
+        """
+        Same as module.base.button.match_first(), but reuses results of buttons whose searched area didn't change.
+        """
+        if isinstance(offset, (list, np.ndarray)):
+            offset = tuple(offset)
+        crops = {}
+        for button in buttons:
+            key = (button, 'match', offset, threshold, True)
+            result = self._get(key, button.search_area(offset), button)
+            if result is None:
+                appear = match_first([button], image, offset=offset, threshold=threshold, crops=crops) is not None
+                self._set(key, button, (appear, button._button_offset))
+            else:
+                appear, button_offset = result
+                if appear:
+                    button._button_offset = button_offset
+            if appear:
+                return button
+
+        return None
+
+    def match_parallel(self, buttons, image, offset=30, threshold=0.85, static=True):
+        """
+        Same as module.base.button.match_parallel(), but reuses results of buttons whose searched area didn't change.
+        Cache is read and written in current thread, only cache misses go to worker threads.
+
+        Returns:
+            list[bool]:
+        """
+        if isinstance(offset, (list, np.ndarray)):
+            offset = tuple(offset)
+        results = {}
+        pending = []
+        for button in buttons:
+            area = button.search_area(offset) if static else None
+            key = (button, 'match', offset, threshold, static)
+            result = self._get(key, area, button)
+            if result is None:
+                pending.append(button)
+            else:
+                appear, button_offset = result
+                if appear:
+                    button._button_offset = button_offset
+                results[button] = appear
+
+        appears = match_parallel(pending, image, offset=offset, threshold=threshold, static=static)
+        for button, appear in zip(pending, appears):
+            key = (button, 'match', offset, threshold, static)
+            self._set(key, button, (appear, button._button_offset))
+            results[button] = appear
+
+        return [results[button] for button in buttons]
+
+    def appear_on(self, button: Button, image, threshold=10) -> bool:
+        """
+        Same as Button.appear_on(), but reuses the result if button area didn't change.
+        """
+        key = (button, 'color', threshold)
+
+        result = self._get(key, button.area, button)
+        if result is not None:
+            return result
+
+        appear = button.appear_on(image, threshold=threshold)
+        self._set(key, button, appear)
+        return appear
@@ -1,5 +1,103 @@
+from functools import wraps
+
+import cv2
+import numpy as np
+from adbutils import AdbError
+
 from module.device.connection import Connection
+from module.device.method.utils import RETRY_TRIES, retry_sleep, handle_adb_error, ImageTruncated, \
+    register_screenshot_method
+from module.exception import RequestHumanTakeover
+from module.logger import logger
+
+
+def retry(func):
+    @wraps(func)
+    def retry_wrapper(self, *args, **kwargs):
+        """
+        Args:
+            self (Adb):
+        """
+        init = None
+        for _ in range(RETRY_TRIES):
+            try:
+                if callable(init):
+                    retry_sleep(_)
+                    init()
+                return func(self, *args, **kwargs)
+            # Can't handle
+            except RequestHumanTakeover:
+                break
+            # When adb server was killed
+            except ConnectionResetError as e:
+                logger.error(e)
+
+                def init():
+                    self.adb_reconnect()
+            # AdbError
+            except AdbError as e:
+                if handle_adb_error(e):
+                    def init():
+                        self.adb_reconnect()
+                else:
+                    break
+            # ImageTruncated
+            except ImageTruncated as e:
+                logger.error(e)
+
+                def init():
+                    pass
+            # Unknown
+            except Exception as e:
+                logger.exception(e)
+
+                def init():
+                    pass
+
+        logger.critical(f'Retry {func.__name__}() failed')
+        raise RequestHumanTakeover
+
+    return retry_wrapper
 
 
 class Adb(Connection):
-    pass
+    @staticmethod
+    def load_screencap(data):
+        """
+        Args:
+            data (bytes): Raw framebuffer from `screencap`, without `-p`
+
+        Returns:
+            np.ndarray: RGB image
+        """
+        if len(data) < 500:
+            logger.warning(f'Unexpected screenshot: {data}')
+        # Header is (width, height, format) on older Android and (width, height, format, colorspace) on Android 9+,
+        # take pixels from the end so both are supported.
+        header = np.frombuffer(data[0:12], dtype=np.uint32)
+        if header.size < 3:
+            raise ImageTruncated('Empty image after reading from buffer')
+        width, height, _ = header
+        # screencap sends RGBA
+        channel = 4
+        size = int(width) * int(height) * channel
+        image = np.frombuffer(data, dtype=np.uint8)
+        if size <= 0 or image.size < size:
+            raise ImageTruncated(f'Screencap data truncated, expect {size} bytes for {width}x{height}, got {image.size}')
+        image = image[-size:].reshape((int(height), int(width), channel))
+
+        image = cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
+        if image is None:
+            raise ImageTruncated('Empty image after cv2.cvtColor')
+
+        return image
+
+    @register_screenshot_method('ADB')
+    @retry
+    def screenshot_adb(self):
+        """
+        `adb exec-out screencap`, slow but needs nothing installed on the device.
+        Raw framebuffer is transferred instead of `screencap -p`, which saves PNG encoding on the device.
+        """
+        data = self.adb_shell(['screencap'], stream=True)
+        return self.load_screencap(data)
@@ -1,15 +1,22 @@
+import asyncio
+import threading
+import time
 import typing as t
+from collections import deque
 from functools import cached_property, wraps
 
 import cv2
 import numpy as np
 import requests
+import websockets
 from adbutils import AdbError
 
 from module.base.decorator import del_cached_property
+from module.base.profiler import Profiler
 from module.base.timer import Timer
 from module.device.method.uiautomator_2 import Uiautomator2, ProcessInfo
-from module.device.method.utils import RETRY_TRIES, retry_sleep, handle_adb_error, PackageNotInstalled, ImageTruncated
+from module.device.method.utils import RETRY_TRIES, retry_sleep, handle_adb_error, PackageNotInstalled, ImageTruncated, \
+    Rgb565Decoder, Rgb565Frame, register_screenshot_method
 from module.exception import RequestHumanTakeover
 from module.logger import logger
 
@@ -86,6 +93,185 @@ def retry(func):
     return retry_wrapper
 
 
+def retry_websocket(func):
+    """
+    Same as retry(), but re-initialize DroidCastS instead of DroidCast_raw,
+    since DroidCastS and DroidCast_raw can't run at the same time.
+    """
+
+    @wraps(func)
+    def retry_wrapper(self, *args, **kwargs):
+        """
+        Args:
+            self (DroidCast):
+        """
+        init = None
+        for _ in range(RETRY_TRIES):
+            try:
+                if callable(init):
+                    retry_sleep(_)
+                    init()
+                return func(self, *args, **kwargs)
+            # Can't handle
+            except RequestHumanTakeover:
+                break
+            # When adb server was killed
+            except ConnectionResetError as e:
+                logger.error(e)
+
+                def init():
+                    self.adb_reconnect()
+            # AdbError
+            except AdbError as e:
+                if handle_adb_error(e):
+                    def init():
+                        self.adb_reconnect()
+                else:
+                    break
+            # Package not installed
+            except PackageNotInstalled as e:
+                logger.error(e)
+            # DroidCastS websocket closed or not running
+            # websockets.exceptions.ConnectionClosedError: sent 1011 (unexpected error) keepalive ping timeout
+            # ConnectionRefusedError: [WinError 1225] The remote computer refused the network connection
+            # requests.exceptions.ConnectionError: DroidCastS not started in droidcast_wait_startup()
+            except (websockets.exceptions.WebSocketException, asyncio.TimeoutError, ConnectionRefusedError,
+                    requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout) as e:
+                logger.error(e)
+
+                def init():
+                    self.droidcast_websocket_init()
+            # ImageTruncated
+            except ImageTruncated as e:
+                logger.error(e)
+
+                def init():
+                    pass
+            # Unknown
+            except Exception as e:
+                logger.exception(e)
+
+                def init():
+                    pass
+
+        logger.critical(f'Retry {func.__name__}() failed')
+        raise RequestHumanTakeover
+
+    return retry_wrapper
+
+
+class DroidCastStream:
+    def __init__(self, fetch, interval=0.1, length=2):
+        """
+        Keep pulling frames in a background thread,
+        so screenshot() can take the newest one without waiting for HTTP round-trip.
+
+        Producer doesn't retry, it stops at the first error and lets the consumer handle it,
+        so DroidCast is never re-initialized concurrently with adb calls in the main thread.
+
+        Args:
+            fetch (callable): Function that returns a screenshot without retrying, such as DroidCast._droidcast_raw
+            interval (int, float): Minimum interval between two fetches
+            length (int): Frames to keep in ring buffer
+        """
+        self.fetch = fetch
+        self.interval = interval
+        # (index, time when fetch started, image)
+        self.frames = deque(maxlen=length)
+        self.condition = threading.Condition()
+        self.error = None
+        self._produced = 0
+        self._consumed = 0
+        # Frames fetched before it are outdated
+        self._valid_after = 0.
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_alive:
+            return
+        logger.info('DroidCast stream start')
+        self._stop_event.clear()
+        self.error = None
+        self._thread = threading.Thread(target=self._produce, name='DroidCastStream', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.is_alive:
+            return
+        logger.info('DroidCast stream stop')
+        self._stop_event.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def invalidate(self):
+        """
+        Drop frames fetched before now, call this after controlling the device
+        so the next get() won't return the screen before control.
+        """
+        with self.condition:
+            self._valid_after = time.perf_counter()
+
+    def _produce(self):
+        timer = Timer(self.interval)
+        while not self._stop_event.is_set():
+            timer.wait()
+            timer.reset()
+            start = time.perf_counter()
+            try:
+                image = self.fetch()
+            except Exception as e:
+                with self.condition:
+                    self.error = e
+                    self.condition.notify_all()
+                return
+            with self.condition:
+                self._produced += 1
+                self.frames.append((self._produced, start, image))
+                self.condition.notify_all()
+
+    def _received(self):
+        if not self.frames:
+            return False
+        index, start, _ = self.frames[-1]
+        return index > self._consumed and start > self._valid_after
+
+    def get(self, poll=1):
+        """
+        Get the newest frame that hasn't been returned before and was fetched after the last invalidate().
+        Usually there's already one in buffer, so this won't block.
+
+        Args:
+            poll (int, float): Interval to check if producer thread is still alive
+
+        Returns:
+            np.ndarray:
+
+        Raises:
+            Exception: The error that stopped producer
+            RequestHumanTakeover: If producer stopped without error
+        """
+        with self.condition:
+            while 1:
+                received = self.condition.wait_for(
+                    lambda: self.error is not None or self._received(),
+                    timeout=poll
+                )
+                if self.error is not None:
+                    error, self.error = self.error, None
+                    raise error
+                if received:
+                    self._consumed, _, image = self.frames[-1]
+                    return image
+                if not self.is_alive:
+                    logger.warning('DroidCast stream stopped without any new frame')
+                    raise RequestHumanTakeover
+
+
 class DroidCast(Uiautomator2):
     _droidcast_port: int = 0
 
@@ -110,6 +296,7 @@ class DroidCast(Uiautomator2):
             To get WEBP screenshots.
         - /src
             Websocket to get JPG screenshots.
+            Not available on DroidCast_raw, see screenshot_droidcast_websocket() which uses DroidCastS.
 
         Note that /screenshot?format=jpg is unavailable.
         """
@@ -162,9 +349,82 @@ class DroidCast(Uiautomator2):
                 yield proc
             if 'com.torther.droidcasts.Main' in proc.cmdline:
                 yield proc
+            # DroidCast_raw and DroidCastS listen on the same port, kill one before switching to another
+            if 'ink.mol.droidcast_raw.Main' in proc.cmdline:
+                yield proc
+
+    def droidcast_websocket_init(self):
+        logger.hr('DroidCast websocket init')
+        self.droidcast_websocket_close()
+        self.droidcast_stop()
+
+        # DroidCastS, a DroidCast fork that serves /src websocket
+        logger.info('Pushing DroidCastS apk')
+        self.adb_push(self.config.DROIDCAST_RAW_FILEPATH_LOCAL, self.config.DROIDCAST_RAW_FILEPATH_REMOTE)
+
+        logger.info('Starting DroidCastS apk')
+        resp = self.u2_shell_background([
+            f'CLASSPATH={self.config.DROIDCAST_RAW_FILEPATH_REMOTE}',
+            'app_process',
+            '/',
+            'com.torther.droidcasts.Main',
+            '>',
+            '/dev/null'
+        ])
+        logger.info(resp)
+
+        del_cached_property(self, 'droidcast_session')
+        _ = self.droidcast_session
+        logger.attr('DroidCast', self.droidcast_url('/src'))
+        self.droidcast_wait_startup()
+
+    @cached_property
+    def droidcast_websocket_loop(self):
+        # websockets is asyncio only, run it in a private event loop
+        return asyncio.new_event_loop()
+
+    @cached_property
+    def droidcast_websocket(self):
+        """
+        Persistent connection to /src, instead of a HTTP request for each screenshot.
+
+        Returns:
+            websockets.WebSocketClientProtocol:
+        """
+        self._droidcast_port = self.adb_forward('tcp:53516')
+        url = f'ws://127.0.0.1:{self._droidcast_port}/src'
+
+        # websockets.connect() binds to the current event loop when it's created,
+        # so create it inside the private loop
+        async def connect():
+            return await websockets.connect(url, open_timeout=3, max_size=None, ping_interval=None)
+
+        return self.droidcast_websocket_loop.run_until_complete(connect())
+
+    def droidcast_websocket_close(self):
+        if 'droidcast_websocket' not in self.__dict__:
+            return
+        try:
+            self.droidcast_websocket_loop.run_until_complete(
+                asyncio.wait_for(self.droidcast_websocket.close(), timeout=3))
+        except Exception as e:
+            logger.warning(f'Failed to close DroidCast websocket: {e}')
+        del_cached_property(self, 'droidcast_websocket')
+
+    @cached_property
+    def rgb565_decoder(self):
+        return Rgb565Decoder(shape=(1280, 720))
 
+    @register_screenshot_method('DroidCast')
+    @Profiler.timeit('DroidCast.screenshot_droidcast_raw')
     @retry
     def screenshot_droidcast_raw(self):
+        return self._droidcast_raw()
+
+    def _droidcast_raw(self):
+        """
+        screenshot_droidcast_raw() without retrying.
+        """
         self.config.DROIDCAST_VERSION = 'DroidCast_raw'
         shape = (1280, 720)
         image = self.droidcast_session.get(self.droidcast_raw_url(), timeout=3).content
@@ -186,39 +446,68 @@ class DroidCast(Uiautomator2):
             # ValueError: cannot reshape array of size 0 into shape (720,1280)
             raise ImageTruncated(str(e))
 
-        # Convert RGB565 to RGB888
-        # https://blog.csdn.net/happy08god/article/details/10516871
-
-        # r = (arr & 0b1111100000000000) >> (11 - 3)
-        # g = (arr & 0b0000011111100000) >> (5 - 2)
-        # b = (arr & 0b0000000000011111) << 3
-        # r |= (r & 0b11100000) >> 5
-        # g |= (g & 0b11000000) >> 6
-        # b |= (b & 0b11100000) >> 5
-        # r = r.astype(np.uint8)
-        # g = g.astype(np.uint8)
-        # b = b.astype(np.uint8)
-        # image = cv2.merge([r, g, b])
-
-        # The same as the code above but costs about 3~4ms instead of 10ms.
-        # Note that cv2.convertScaleAbs is 5x fast as cv2.multiply, cv2.add is 8x fast as cv2.convertScaleAbs
-        # Note that cv2.convertScaleAbs includes rounding
-        r = cv2.bitwise_and(arr, 0b1111100000000000)
-        r = cv2.convertScaleAbs(r, alpha=0.00390625)
-        m = cv2.convertScaleAbs(r, alpha=0.03125)
-        cv2.add(r, m, dst=r)
-
-        g = cv2.bitwise_and(arr, 0b0000011111100000)
-        g = cv2.convertScaleAbs(g, alpha=0.125)
-        m = cv2.convertScaleAbs(g, alpha=0.015625, dst=m)
-        cv2.add(g, m, dst=g)
-
-        b = cv2.bitwise_and(arr, 0b0000000000011111)
-        b = cv2.convertScaleAbs(b, alpha=8)
-        m = cv2.convertScaleAbs(b, alpha=0.03125, dst=m)
-        cv2.add(b, m, dst=b)
-
-        image = cv2.merge([r, g, b])
+        # Rows are decoded to RGB888 when they are accessed
+        return Rgb565Frame(arr, decoder=self.rgb565_decoder)
+
+    @cached_property
+    def droidcast_stream(self):
+        return DroidCastStream(
+            fetch=self._droidcast_raw,
+            interval=self.config.DROIDCAST_STREAM_INTERVAL,
+            length=self.config.DROIDCAST_STREAM_LENGTH,
+        )
+
+    @register_screenshot_method('DroidCast_stream', release='droidcast_stream_stop', benchmark=False)
+    def screenshot_droidcast_stream(self):
+        """
+        Same as screenshot_droidcast_raw, but frames are pulled by a background thread.
+        """
+        if not self.droidcast_stream.is_alive:
+            self.droidcast_stream.start()
+        try:
+            return self.droidcast_stream.get()
+        except Exception as e:
+            # Producer stops at the first error, retry and re-initialize DroidCast in current thread.
+            # Stream restarts on the next screenshot.
+            logger.warning(f'DroidCast stream stopped: {e.__class__.__name__}: {e}')
+            self.droidcast_stream.stop()
+            return self.screenshot_droidcast_raw()
+
+    def droidcast_stream_invalidate(self):
+        """
+        Call this after controlling the device.
+        """
+        if 'droidcast_stream' in self.__dict__:
+            self.droidcast_stream.invalidate()
+
+    def droidcast_stream_stop(self):
+        if 'droidcast_stream' in self.__dict__:
+            self.droidcast_stream.stop()
+            del_cached_property(self, 'droidcast_stream')
+
+    @register_screenshot_method('DroidCast_websocket', release='droidcast_websocket_close')
+    @retry_websocket
+    def screenshot_droidcast_websocket(self):
+        """
+        DroidCastS sends a JPG screenshot for each message received on /src.
+        Note that JPG is lossy, colors may differ a little from DroidCast_raw.
+        """
+        self.config.DROIDCAST_VERSION = 'DroidCastS'
+        loop = self.droidcast_websocket_loop
+        ws = self.droidcast_websocket
+        loop.run_until_complete(asyncio.wait_for(ws.send('screenshot'), timeout=3))
+        image = loop.run_until_complete(asyncio.wait_for(ws.recv(), timeout=3))
+        if not isinstance(image, bytes):
+            raise ImageTruncated(f'Unexpected websocket message: {image[:500]}')
+
+        image = np.frombuffer(image, np.uint8)
+        image = cv2.imdecode(image, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ImageTruncated('Empty image after cv2.imdecode')
+
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        if image is None:
+            raise ImageTruncated('Empty image after cv2.cvtColor')
 
         return image
 
@@ -329,6 +329,10 @@ class Minitouch(Connection):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    def handle_control_sent(self):
+        # Will be overridden in Device
+        pass
+
     @cached_property
     def minitouch_builder(self):
         self.minitouch_init()
@@ -414,6 +418,7 @@ class Minitouch(Connection):
         self._minitouch_client.recv(0)
         time.sleep(self.minitouch_builder.delay / 1000 + self.minitouch_builder.DEFAULT_DELAY)
         self.minitouch_builder.clear()
+        self.handle_control_sent()
 
     @retry
     def click_minitouch(self, x, y):
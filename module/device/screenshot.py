@@ -1,17 +1,134 @@
 from collections import deque
+import time
 from datetime import datetime
 from functools import cached_property
 
+import cv2
+import numpy as np
+
+from module.base.button import FRAME_MATCH_CACHE
+from module.base.color import ColorChecker
+from module.base.profiler import Profiler
 from module.base.timer import Timer
 from module.base.utils import image_size
+from module.device.frame_change import FrameChangeDetector
+from module.device.method.adb import Adb
 from module.device.method.droidcast import DroidCast
+from module.device.method.utils import Rgb565Decoder, SCREENSHOT_METHODS
+from module.exception import RequestHumanTakeover
+from module.logger import logger
 
 
 class ScreenshotSizeError(Exception):
     pass
 
 
-class Screenshot(DroidCast):
+class ScreenshotRingBuffer:
+    def __init__(self, budget):
+        """
+        Keep recent screenshots for error logs, within a memory budget.
+        Screenshots are stored as RGB565 bitmaps, which is 2/3 the size of RGB888 and is what DroidCast_raw sends,
+        and decoded only when iterating.
+
+        Args:
+            budget (int): Max bytes to keep. The newest screenshot is always kept even if it exceeds the budget.
+        """
+        self.budget = budget
+        self.size = 0
+        self.frames = deque()
+
+    def append(self, data):
+        """
+        Args:
+            data (dict): {"time": datetime, "image": np.ndarray or Rgb565Frame}
+        """
+        image = data["image"]
+        if isinstance(image, np.ndarray):
+            # Packed into shape (height, width, 2), which is the same bytes as uint16 RGB565
+            bitmap = cv2.cvtColor(image, cv2.COLOR_RGB2BGR565).view(np.uint16)[:, :, 0]
+        else:
+            # Rgb565Frame, keep the received bitmap without decoding
+            bitmap = image.raw
+        self.frames.append((data["time"], bitmap))
+        self.size += bitmap.nbytes
+        while len(self.frames) > 1 and self.size > self.budget:
+            _, bitmap = self.frames.popleft()
+            self.size -= bitmap.nbytes
+
+    def clear(self):
+        self.frames.clear()
+        self.size = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def snapshot(self):
+        """
+        Returns:
+            list[tuple[datetime, np.ndarray]]: Time and RGB565 bitmap of kept screenshots, not decoded
+        """
+        return list(self.frames)
+
+    def __iter__(self):
+        """
+        Yields:
+            dict: {"time": datetime, "image": np.ndarray}, decoded to RGB888
+        """
+        decoder = Rgb565Decoder()
+        for image_time, bitmap in list(self.frames):
+            yield {"time": image_time, "image": decoder.decode(bitmap)}
+
+
+class AdaptiveInterval:
+    def __init__(self, minimum, maximum, backoff=1.5, stable_count=2):
+        """
+        Screenshot as fast as `minimum` while screen is changing,
+        and slow down step by step to `maximum` while screen stays the same.
+
+        Args:
+            minimum (int, float): Interval when screen is changing
+            maximum (int, float): Interval when screen is stable
+            backoff (float): Multiply interval by this when screen stays the same
+            stable_count (int): Back off after how many unchanged frames
+        """
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.backoff = backoff
+        self.stable_count = stable_count
+        self.interval = minimum
+        self._stable = 0
+
+    @property
+    def fps(self):
+        return 1 / self.interval if self.interval > 0 else float('inf')
+
+    def reset(self):
+        self.interval = self.minimum
+        self._stable = 0
+        return self.interval
+
+    def update(self, changed):
+        """
+        Args:
+            changed (bool): If current screenshot is different from the previous one
+
+        Returns:
+            float: Next interval
+        """
+        if changed:
+            return self.reset()
+        self._stable += 1
+        if self._stable >= self.stable_count:
+            self.interval = min(self.interval * self.backoff, self.maximum)
+        return self.interval
+
+
+class Screenshot(Adb, DroidCast):
+    _image = None
+    _frame = None
+    # (frame_id, ColorChecker)
+    _color_checker = None
+
     def __init__(self, config):
         super().__init__(config)
         self._screenshot_interval = Timer(
@@ -20,44 +137,237 @@ class Screenshot(DroidCast):
 
     @cached_property
     def screenshot_methods(self):
-        return {
-            "DroidCast": self.screenshot_droidcast_raw,
-        }
+        """
+        Screenshot methods registered by @register_screenshot_method
+
+        Returns:
+            dict[str, callable]: key: Name used in config `Emulator_ScreenshotMethod`, value: Bound method
+        """
+        return {name: getattr(self, func) for name, (func, _, _) in SCREENSHOT_METHODS.items()}
+
+    def screenshot_method_release(self, keep=None):
+        """
+        Release background threads and connections of screenshot methods.
+
+        Args:
+            keep (str): Name of the screenshot method in use
+        """
+        for name, (_, release, _) in SCREENSHOT_METHODS.items():
+            if name != keep and release is not None:
+                getattr(self, release)()
+
+    def _screenshot_benchmark_method(self, method, trial):
+        """
+        Args:
+            method (callable):
+            trial (int):
+
+        Returns:
+            float: Average cost in seconds, None if method is not available
+        """
+        try:
+            # First screenshot includes initialization, such as pushing apk and starting server
+            self._handle_orientated_image(method())
+            costs = []
+            for _ in range(trial):
+                start = time.perf_counter()
+                self._handle_orientated_image(method())
+                costs.append(time.perf_counter() - start)
+        except (RequestHumanTakeover, ScreenshotSizeError) as e:
+            logger.warning(f'Screenshot method unavailable: {e.__class__.__name__}: {e}')
+            return None
+        return sum(costs) / len(costs)
+
+    @cached_property
+    def screenshot_benchmark_methods(self):
+        """
+        Returns:
+            dict[str, callable]: Screenshot methods to benchmark, key: Name, value: Bound method
+        """
+        return {name: getattr(self, func) for name, (func, _, benchmark) in SCREENSHOT_METHODS.items() if benchmark}
+
+    def screenshot_benchmark(self):
+        """
+        Try every screenshot method and find the fastest one that works on current device.
+        DroidCast_stream is not included, it costs the interval of its background thread only.
+
+        Returns:
+            str: Name of the screenshot method
+
+        Raises:
+            RequestHumanTakeover: If all screenshot methods failed
+        """
+        logger.hr('Screenshot benchmark', level=1)
+        trial = max(int(self.config.SCREENSHOT_BENCHMARK_TRIAL), 1)
+        result = {}
+        for name, method in self.screenshot_benchmark_methods.items():
+            logger.hr(name, level=2)
+            cost = self._screenshot_benchmark_method(method, trial)
+            self.screenshot_method_release()
+            if cost is not None:
+                result[name] = cost
+
+        logger.hr('Screenshot benchmark result', level=2)
+        for name in self.screenshot_benchmark_methods:
+            cost = result.get(name)
+            logger.attr(name, f'{round(cost * 1000)}ms' if cost is not None else 'Failed')
+        if not result:
+            logger.critical('No screenshot method available')
+            raise RequestHumanTakeover
+
+        fastest = min(result, key=result.get)
+        logger.attr('ScreenshotMethod', fastest)
+        # DroidCast_websocket replaced DroidCast_raw with DroidCastS on the same port, restore it
+        if fastest == 'DroidCast' and self.config.DROIDCAST_VERSION == 'DroidCastS':
+            self.droidcast_init()
+        return fastest
+
+    @cached_property
+    def screenshot_method_auto(self):
+        return self.screenshot_benchmark()
+
+    @property
+    def screenshot_method(self):
+        """
+        Returns:
+            str: Name of the screenshot method in use
+        """
+        method = self.config.Emulator_ScreenshotMethod
+        if method == 'auto':
+            method = self.screenshot_method_auto
+        return method
+
+    @cached_property
+    def screenshot_interval_adaptive(self):
+        return AdaptiveInterval(
+            minimum=float(self.config.Emulator_ScreenshotInterval),
+            maximum=self.config.SCREENSHOT_INTERVAL_ADAPTIVE_MAX,
+            backoff=self.config.SCREENSHOT_INTERVAL_ADAPTIVE_BACKOFF,
+            stable_count=self.config.SCREENSHOT_INTERVAL_ADAPTIVE_STABLE_COUNT,
+        )
+
+    def screenshot_interval_adapt(self):
+        """
+        Set screenshot interval according to whether the screen is changing.
+        """
+        adaptive = self.screenshot_interval_adaptive
+        prev = adaptive.interval
+        interval = adaptive.update(self.frame_change.changed())
+        self._screenshot_interval.limit = interval
+        # Log only when reaching the fastest or slowest rate
+        if interval != prev and interval in [adaptive.minimum, adaptive.maximum]:
+            logger.attr('ScreenshotFPS', round(adaptive.fps, 2))
+
+    def screenshot_interval_reset(self):
+        """
+        Go back to the fastest screenshot rate, call this after a click since the screen is going to change.
+        """
+        if not self.config.Emulator_AdaptiveScreenshotInterval:
+            return
+        adaptive = self.screenshot_interval_adaptive
+        if adaptive.interval != adaptive.minimum:
+            adaptive.reset()
+            self._screenshot_interval.limit = adaptive.interval
+            logger.attr('ScreenshotFPS', round(adaptive.fps, 2))
+
+    @cached_property
+    def frame_change(self):
+        return FrameChangeDetector(tile=self.config.SCREENSHOT_FRAME_CHANGE_TILE)
 
     @cached_property
     def screenshot_deque(self):
-        return deque(maxlen=int(self.config.Error_ScreenshotLength))
+        return ScreenshotRingBuffer(budget=int(self.config.Error_ScreenshotBudget))
+
+    @property
+    def image(self):
+        """
+        Current screenshot, fully decoded on first access if the screenshot method returns a lazy frame.
+
+        Returns:
+            np.ndarray:
+        """
+        if self._image is None and self._frame is not None:
+            self._image = np.asarray(self._frame)
+            FRAME_MATCH_CACHE.add_image(self._image)
+        return self._image
+
+    @image.setter
+    def image(self, value):
+        self._image = value
+        self._frame = None
+        self.frame_change.new_frame(value)
+        FRAME_MATCH_CACHE.new_frame(value)
+
+    @property
+    def color_checker(self):
+        """
+        ColorChecker of current screenshot, built once per screenshot on first access.
+
+        Returns:
+            ColorChecker:
+        """
+        frame_id = self.frame_change.frame_id
+        if self._color_checker is None or self._color_checker[0] != frame_id:
+            self._color_checker = (frame_id, ColorChecker(self.frame))
+        return self._color_checker[1]
+
+    @property
+    def frame(self):
+        """
+        Current screenshot without forcing a full decode.
+        Lazy frames decode only the rows accessed by crop(), get_color() and Button.match().
+
+        Returns:
+            np.ndarray, Rgb565Frame:
+        """
+        if self._image is not None:
+            return self._image
+        return self._frame
 
     def screenshot(self):
         """
         截图
 
         Returns:
-            np.ndarray:
+            np.ndarray, Rgb565Frame: Use self.image to get the decoded np.ndarray
         """
 
         # 每次两次截图间隔时间
+        # Waiting is reported separately, so Screenshot.capture is the cost of the screenshot method itself
+        start = time.perf_counter()
         self._screenshot_interval.wait()
         self._screenshot_interval.reset()
+        Profiler.add('Screenshot.interval_wait', time.perf_counter() - start)
 
-        method = self.screenshot_methods.get(self.config.Emulator_ScreenshotMethod)
-        self.image = method()
+        method = self.screenshot_methods.get(self.screenshot_method)
+        start = time.perf_counter()
+        frame = method()
+        frame = self._handle_orientated_image(frame)
+        Profiler.add('Screenshot.capture', time.perf_counter() - start)
+        if isinstance(frame, np.ndarray):
+            self.image = frame
+        else:
+            self._image = None
+            self._frame = frame
+            self.frame_change.new_frame(frame)
+            FRAME_MATCH_CACHE.new_frame(frame)
 
-        self.image = self._handle_orientated_image(self.image)
+        self.screenshot_deque.append({"time": datetime.now(), "image": frame})
 
-        self.screenshot_deque.append({"time": datetime.now(), "image": self.image})
+        if self.config.Emulator_AdaptiveScreenshotInterval:
+            self.screenshot_interval_adapt()
 
-        return self.image
+        return self.frame
 
     def _handle_orientated_image(self, image):
         """
         Args:
-            image (np.ndarray):
+            image (np.ndarray, Rgb565Frame):
 
         Returns:
-            np.ndarray:
+            np.ndarray, Rgb565Frame:
         """
-        width, height = image_size(self.image)
+        width, height = image_size(image)
         if width == 720 and height == 1280:
             return image
 
@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import cv2
+
+from module.device.method.utils import Rgb565Decoder
+from module.handler.sensitive_info import handle_sensitive_logs
+from module.logger import logger
+
+
+class ErrorLogWriter:
+    def __init__(self, workers=4, compression=1):
+        """
+        Write error screenshots and logs in background threads,
+        so scheduler can restart the game without waiting for PNG encoding.
+        cv2 releases GIL when encoding, screenshots are encoded in parallel.
+
+        Args:
+            workers (int): Number of threads.
+            compression (int): PNG compression level, 0 to 9, lower is faster.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ErrorLog')
+        self.compression = compression
+
+    def save(self, folder, frames, log_file, log_start=0):
+        """
+        Args:
+            folder (str): Existing folder to save into.
+            frames (list[tuple[datetime, np.ndarray]]): RGB565 bitmaps from ScreenshotRingBuffer.snapshot()
+            log_file (str):
+            log_start (int): Byte offset where the current task starts in log_file.
+
+        Returns:
+            list[Future]:
+        """
+        # Cut logs at the moment of error, logs after it are about restarting
+        try:
+            log_end = os.path.getsize(log_file)
+        except (OSError, TypeError):
+            log_end = 0
+
+        futures = [self.executor.submit(self._save_image, folder, time, bitmap) for time, bitmap in frames]
+        futures.append(self.executor.submit(self._save_log, folder, log_file, log_start, log_end))
+        return futures
+
+    def _save_image(self, folder, time, bitmap):
+        try:
+            image = Rgb565Decoder(shape=bitmap.shape).decode(bitmap)
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            _, data = cv2.imencode('.png', image, [cv2.IMWRITE_PNG_COMPRESSION, self.compression])
+            image_time = datetime.strftime(time, "%Y-%m-%d_%H-%M-%S-%f")
+            with open(f"{folder}/{image_time}.png", "wb") as f:
+                f.write(data.tobytes())
+        except Exception as e:
+            logger.exception(e)
+
+    @staticmethod
+    def _save_log(folder, log_file, start, end):
+        try:
+            if start > end:
+                start = 0
+            with open(log_file, "rb") as f:
+                f.seek(start)
+                text = f.read(end - start).decode("utf-8", errors="replace")
+            # 替换真实路径
+            lines = handle_sensitive_logs(text.splitlines(keepends=True))
+            with open(f"{folder}/log.txt", "w", encoding="utf-8") as f:
+                f.writelines(lines)
+        except Exception as e:
+            logger.exception(e)
@@ -8,15 +8,19 @@ from module.logger import logger
 
 
 class InfoHandler(ModuleBase):
+    # Handlers are checked in every loop of ui_additional().
+    # Buttons that don't need color to be told apart search the whole screenshot with mode='luma', which is faster.
+    # Confirm buttons look alike except color, they stay on color matching.
+
     def handle_paid_gift(self, interval=1):
         if self.appear(
-                PAID_GIFT_CHECK, offset=(30, 30), interval=interval, static=False
+                PAID_GIFT_CHECK, offset=(30, 30), interval=interval, static=False, mode='luma'
         ):
             if self.appear_text_then_click("点击关闭画面", interval=interval):
                 return True
 
         elif self.appear(
-                PAID_GIFT_CONFIRM_CHECK, offset=(30, 30), interval=interval, static=False
+                PAID_GIFT_CONFIRM_CHECK, offset=(30, 30), interval=interval, static=False, mode='luma'
         ):
             if self.appear_then_click(
                     CONFIRM_B, offset=(30, 30), interval=interval, static=False
@@ -97,7 +101,7 @@ class InfoHandler(ModuleBase):
 
     def handle_reward(self, interval=5):
         if self.appear_then_click(
-                REWARD, offset=(30, 30), interval=interval, static=False
+                REWARD, offset=(30, 30), interval=interval, static=False, mode='luma'
         ):
             return True
 
@@ -109,7 +113,7 @@ class InfoHandler(ModuleBase):
 
     def handle_server(self):
         if self.appear(
-                SERVER_CHECK, offset=(30, 30), interval=3, static=False
+                SERVER_CHECK, offset=(30, 30), interval=3, static=False, mode='luma'
         ) and self.appear_then_click(
             CONFIRM_A, offset=(30, 30), interval=3, static=False
         ):
@@ -141,19 +145,19 @@ class InfoHandler(ModuleBase):
 
     def handle_download(self):
         if self.appear(
-                DOWNLOAD_CHECK, offset=(30, 30), interval=3, static=False
+                DOWNLOAD_CHECK, offset=(30, 30), interval=3, static=False, mode='luma'
         ) and self.appear_then_click(
             CONFIRM_A, offset=(30, 30), interval=3, static=False
         ):
             return True
 
     def handle_system_error(self):
-        if self.appear(SYSTEM_ERROR_CHECK, offset=(30, 30), interval=3, static=False):
+        if self.appear(SYSTEM_ERROR_CHECK, offset=(30, 30), interval=3, static=False, mode='luma'):
             raise GameStuckError("detected system error")
 
     def handle_system_maintenance(self):
         if self.appear(
-                SYSTEM_MAINTENANCE_CHECK, offset=(30, 30), interval=3, static=False
+                SYSTEM_MAINTENANCE_CHECK, offset=(30, 30), interval=3, static=False, mode='luma'
         ):
             raise GameServerUnderMaintenance("Server is currently under maintenance")
 
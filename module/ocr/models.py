@@ -3,11 +3,52 @@ from functools import cached_property
 import numpy as np
 
 from module.ocr.nikke_ocr import NikkeOcr
+from module.ocr.server import RemoteOcr
 
 
 class OcrModel:
+    def get_model(self, name):
+        """
+        Args:
+            name (str): 'nikke', 'cnocr' or 'cnocr_num'
+
+        Returns:
+            NikkeOcr, RemoteOcr: Model on OCR server if it's started, otherwise load locally.
+        """
+        load = getattr(self, f'load_{name}')
+        remote = RemoteOcr.from_env(name, load=load)
+        if remote is not None:
+            return remote
+        return load()
+
     @cached_property
     def nikke(self):
+        return self.get_model('nikke')
+
+    @cached_property
+    def cnocr(self):
+        return self.get_model('cnocr')
+
+    @cached_property
+    def cnocr_num(self):
+        return self.get_model('cnocr_num')
+
+    @staticmethod
+    def backend(backend=None):
+        """
+        Args:
+            backend (str): 'pytorch' or 'onnx', None to use deploy config.
+
+        Returns:
+            dict: backend and threads of recognition models.
+        """
+        from module.webui.setting import State
+        if backend is None:
+            backend = State.deploy_config.OcrBackend
+        return {'backend': backend, 'threads': State.deploy_config.OcrThreads}
+
+    @classmethod
+    def load_nikke(cls, backend=None):
         """
             base: cnocr-v2.3-densenet_lite_136-gru.ckpt
             training data: https://github.com/megumiss/NIKKECnOCR/commit/983d2f3542541163dbd695dd497e2961bfd41841
@@ -16,19 +57,20 @@ class OcrModel:
             val-complete_match-epoch: 0.9731
         """
         return NikkeOcr(rec_model_name='densenet_lite_136-gru', root='./bin/cnocr_models/nikke',
-                        model_name='/cnocr-v2.3-densenet_lite_136-gru-nikke.ckpt', name='nikke')
+                        model_name='/cnocr-v2.3-densenet_lite_136-gru-nikke.ckpt', name='nikke',
+                        **cls.backend(backend))
 
-    @cached_property
-    def cnocr(self):
+    @classmethod
+    def load_cnocr(cls, backend=None):
         return NikkeOcr(rec_model_name='densenet_lite_136-gru', root='./bin/cnocr_models/cnocr',
-                        model_name='/cnocr-v2.3-densenet_lite_136-gru.ckpt', name='cnocr')
+                        model_name='/cnocr-v2.3-densenet_lite_136-gru.ckpt', name='cnocr',
+                        **cls.backend(backend))
 
-    @cached_property
-    def cnocr_num(self):
-        
-        
+    @classmethod
+    def load_cnocr_num(cls, backend=None):
         return NikkeOcr(rec_model_name='number-densenet_lite_136-fc', root='./bin/cnocr_models/cnocr',
-                        model_name='/cnocr-v2.3-number-densenet_lite_136-fc-nikke.ckpt', name='cnocr_num')
+                        model_name='/cnocr-v2.3-number-densenet_lite_136-fc-nikke.ckpt', name='cnocr_num',
+                        **cls.backend(backend))
 
     def get_location(self, text, result):
         if result:
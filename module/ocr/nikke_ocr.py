@@ -1,24 +1,188 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import Union, List, Dict, Any, Tuple
 
+import cv2
 import numpy as np
 import torch
 from PIL import Image
 from cnocr import CnOcr
+from cnocr.cn_ocr import OcrResult
 
-from module.base.utils import crop
+from module.base.profiler import Profiler
+from module.base.utils import crop, rgb2luma
+from module.logger import logger
+
+
+def split_lines(image, min_height=6, max_gap=2, padding=2):
+    """
+    Split text lines by horizontal projection profile, assuming lines are not tilted.
+
+    Args:
+        image (np.ndarray): Shape (height, width) or (height, width, channel)
+        min_height (int): Lines lower than it are considered as noise.
+        max_gap (int): Rows without text shorter than it are considered as inside a line.
+        padding (int): Padding around text.
+
+    Returns:
+        list[tuple]: (upper_left_x, upper_left_y, bottom_right_x, bottom_right_y) of each line, from top to bottom.
+    """
+    height, width = image.shape[:2]
+    _, binary = cv2.threshold(rgb2luma(image), 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # Text is the minority, either white on black or black on white
+    if np.count_nonzero(binary) > binary.size / 2:
+        binary = 255 - binary
+
+    lines = []
+    start, last = None, None
+    for y in np.flatnonzero(binary.any(axis=1)):
+        if start is None:
+            start = y
+        elif y - last > max_gap + 1:
+            lines.append((start, last + 1))
+            start = y
+        last = y
+    if start is not None:
+        lines.append((start, last + 1))
+
+    boxes = []
+    for y1, y2 in lines:
+        if y2 - y1 < min_height:
+            continue
+        columns = np.flatnonzero(binary[y1:y2].any(axis=0))
+        x1, x2 = columns[0], columns[-1] + 1
+        boxes.append((max(x1 - padding, 0), max(y1 - padding, 0),
+                      min(x2 + padding, width), min(y2 + padding, height)))
+    return boxes
+
+
+class OcrCache:
+    def __init__(self, name, limit):
+        """
+        LRU cache of OCR results, keyed by image content.
+
+        Args:
+            name (str): Name to report hits in Profiler.
+            limit (int): Max number of results to keep.
+        """
+        self.name = name
+        self.limit = limit
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # OCR server calls models from many threads
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def digest(image):
+        """
+        Args:
+            image (np.ndarray):
+
+        Returns:
+            tuple: Shape, dtype and hash of image.
+        """
+        image = np.ascontiguousarray(image)
+        return image.shape, image.dtype.str, hashlib.blake2b(image.data, digest_size=16).digest()
+
+    def get(self, key):
+        """
+        Returns:
+            Cached result, or None.
+        """
+        with self.lock:
+            result = self.data.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.data.move_to_end(key)
+            Profiler.hit(self.name, result is not None)
+        return result
+
+    def set(self, key, result):
+        with self.lock:
+            self.data[key] = result
+            self.data.move_to_end(key)
+            while len(self.data) > self.limit:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses, size
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.data)}
+
+
+# Results of ocr_for_single_lines() of all models, key: (model name, backend, image digest), value: dict
+OCR_RESULT_CACHE = OcrCache('NikkeOcr.result_cache', limit=1024)
 
 
 class NikkeOcr(CnOcr):
+    # Detection results to keep, detection is the most expensive part of OCR on CPU
+    DETECTION_CACHE_LIMIT = 32
+
     def __init__(self, rec_model_name='densenet_lite_136-gru', det_model_name='ch_PP-OCRv4_det', cand_alphabet=None,
                  context='cpu',
                  root='./bin/cnocr_models/nikke',
-                 model_name='/t25.ckpt', **kwargs):
+                 model_name='/t25.ckpt', backend='pytorch', threads=0, **kwargs):
+        """
+        Args:
+            backend (str): Backend of recognition model, 'pytorch' or 'onnx'.
+                'onnx' uses the .onnx file next to the .ckpt file, exported by dev_tools/ocr_onnx_export.py,
+                and falls back to 'pytorch' if it doesn't exist.
+            threads (int): Number of threads of ONNX Runtime, 0 to let ONNX Runtime decide.
+        """
         model_fp = root + model_name
+        if backend == 'onnx':
+            onnx_fp = os.path.splitext(model_fp)[0] + '.onnx'
+            if os.path.exists(onnx_fp):
+                model_fp = onnx_fp
+            else:
+                logger.warning(f'ONNX model {onnx_fp} not found, use pytorch backend instead')
+                backend = 'pytorch'
         super().__init__(rec_model_name=rec_model_name, det_model_name=det_model_name, rec_model_fp=model_fp,
                          cand_alphabet=cand_alphabet, context=context,
-                         rec_model_backend='pytorch',
+                         rec_model_backend=backend,
                          **kwargs)
+        self.name = kwargs.get('name', model_name)
+        self.backend = backend
+        if backend == 'onnx' and threads:
+            self.set_onnx_threads(threads)
+        # key: (area, image digest, det_kwargs), value: result of det_model.detect()
+        self._detection_cache = OcrCache('NikkeOcr.detection_cache', limit=self.DETECTION_CACHE_LIMIT)
+
+    def set_onnx_threads(self, threads):
+        """
+        Recreate ONNX Runtime session of recognition model on CPU with the given number of threads.
+        cnocr 2.3.1 creates the session in Recognizer._get_model() without session options,
+        so replace Recognizer._model, which is also what Recognizer uses for inference.
+        This relies on the private attributes of cnocr 2.3.1 pinned in requirements.txt.
+
+        Args:
+            threads (int):
+        """
+        import onnxruntime as ort
+        model_fp = getattr(self.rec_model, '_model_fp', None)
+        if model_fp is None or not hasattr(self.rec_model, '_model'):
+            logger.warning(f'Unsupported cnocr version, ONNX Runtime threads of {self.name} are not set')
+            return
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.rec_model._model = ort.InferenceSession(
+            model_fp, sess_options=options, providers=['CPUExecutionProvider'])
 
     def ocr(
             self,
@@ -26,9 +190,167 @@ class NikkeOcr(CnOcr):
             rec_batch_size=1,
             return_cropped_image=False,
             area: Tuple = None,
+            rec_only=False,
+            split=False,
             **det_kwargs,
     ) -> List[Dict[str, Any]]:
+        """
+        Args:
+            img_fp:
+            rec_batch_size:
+            return_cropped_image:
+            area: Area to crop before OCR. Positions in results are relative to area.
+            rec_only: True to skip text detection, and take the whole area as one line.
+                Use it when area is tight around the text.
+            split: If rec_only, split lines by projection profile instead of taking the whole area as one line.
+            **det_kwargs:
+
+        Returns:
+            Same as CnOcr.ocr()
+        """
         if area and isinstance(img_fp, (Image.Image, np.ndarray)):
             img_fp = crop(img_fp, area)
 
+        if isinstance(img_fp, Image.Image):
+            img_fp = np.asarray(img_fp.convert('RGB'))
+        if rec_only and isinstance(img_fp, np.ndarray):
+            return self.ocr_lines(img_fp, rec_batch_size=rec_batch_size, split=split)
+        if self.det_model is not None:
+            return self._ocr_with_det_model(img_fp, rec_batch_size, return_cropped_image, area=area, **det_kwargs)
         return super(NikkeOcr, self).ocr(img_fp, rec_batch_size, return_cropped_image, **det_kwargs)
+
+    def ocr_lines(self, image, rec_batch_size=1, split=False):
+        """
+        Recognition only, without text detection.
+
+        Args:
+            image (np.ndarray):
+            rec_batch_size (int):
+            split (bool): True to split lines by projection profile.
+
+        Returns:
+            Same as CnOcr.ocr(), texts that are empty are dropped.
+        """
+        height, width = image.shape[:2]
+        if min(height, width) < 2:
+            return []
+        boxes = split_lines(image) if split else [(0, 0, width, height)]
+        if not boxes:
+            return []
+
+        outs = self.ocr_for_single_lines([crop(image, box) for box in boxes], batch_size=rec_batch_size)
+        results = []
+        for (x1, y1, x2, y2), out in zip(boxes, outs):
+            if not out['text']:
+                continue
+            _out = OcrResult(**out)
+            _out.position = np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float32)
+            results.append(_out.to_dict())
+        return results
+
+    @Profiler.timeit('NikkeOcr.detect')
+    def detect(self, img, area=None, **det_kwargs):
+        """
+        Same as self.det_model.detect(), but reuses results of the same area on the same image.
+
+        Args:
+            img (np.ndarray): Shape (height, width, 3)
+            area (tuple): Area where img is cropped from.
+            **det_kwargs:
+
+        Returns:
+            dict: Result of det_model.detect()
+        """
+        area = tuple(area) if area else None
+        key = (area, OcrCache.digest(img), tuple(sorted(det_kwargs.items())))
+
+        result = self._detection_cache.get(key)
+        if result is not None:
+            return result
+
+        result = self.det_model.detect(img, **det_kwargs)
+        self._detection_cache.set(key, result)
+        return result
+
+    def ocr_for_single_lines(self, img_list, batch_size=1):
+        """
+        Same as CnOcr.ocr_for_single_lines(), but images recognized before are not sent to the model again.
+
+        Args:
+            img_list (list[np.ndarray]):
+            batch_size (int):
+
+        Returns:
+            list[dict]: text, score
+        """
+        results = [None] * len(img_list)
+        pending = []
+        # key: cache key, value: indexes of the same image in img_list
+        duplicates = {}
+        for index, image in enumerate(img_list):
+            if not isinstance(image, np.ndarray):
+                pending.append((index, None))
+                continue
+            key = (self.name, self.backend, OcrCache.digest(image))
+            if key in duplicates:
+                duplicates[key].append(index)
+                continue
+            result = OCR_RESULT_CACHE.get(key)
+            if result is not None:
+                results[index] = dict(result)
+                continue
+            duplicates[key] = [index]
+            pending.append((index, key))
+
+        if pending:
+            outs = super(NikkeOcr, self).ocr_for_single_lines(
+                [img_list[index] for index, _ in pending], batch_size=batch_size)
+            for (index, key), out in zip(pending, outs):
+                results[index] = out
+                if key is not None:
+                    OCR_RESULT_CACHE.set(key, dict(out))
+        for indexes in duplicates.values():
+            for index in indexes[1:]:
+                results[index] = dict(results[indexes[0]])
+
+        return results
+
+    def _ocr_with_det_model(
+            self,
+            img: Union[str, Path, torch.Tensor, np.ndarray],
+            rec_batch_size: int,
+            return_cropped_image: bool,
+            area: Tuple = None,
+            **det_kwargs,
+    ) -> List[Dict[str, Any]]:
+        """
+        Same as CnOcr._ocr_with_det_model() in cnocr 2.3.1, but detection results are cached.
+        """
+        if isinstance(img, torch.Tensor):
+            img = img.numpy()
+        if not isinstance(img, np.ndarray):
+            return super(NikkeOcr, self)._ocr_with_det_model(img, rec_batch_size, return_cropped_image, **det_kwargs)
+        if len(img.shape) == 3 and img.shape[2] == 1:
+            # (H, W, 1) -> (H, W)
+            img = img.squeeze(-1)
+        if len(img.shape) == 2:
+            # (H, W) -> (H, W, 3)
+            img = np.array(Image.fromarray(img).convert('RGB'))
+
+        box_infos = self.detect(img, area=area, **det_kwargs)
+
+        cropped_img_list = [
+            box_info['cropped_img'] for box_info in box_infos['detected_texts']
+        ]
+        ocr_outs = self.ocr_for_single_lines(
+            cropped_img_list, batch_size=rec_batch_size
+        )
+        results = []
+        for box_info, ocr_out in zip(box_infos['detected_texts'], ocr_outs):
+            _out = OcrResult(**ocr_out)
+            _out.position = box_info['box']
+            if return_cropped_image:
+                _out.cropped_img = box_info['cropped_img']
+            results.append(_out.to_dict())
+
+        return results
@@ -5,6 +5,7 @@ from typing import TYPE_CHECKING
 import numpy as np
 
 from module.base.button import Button
+from module.base.profiler import Profiler
 from module.base.utils import extract_letters, crop, float2str
 from module.logger import logger
 from module.ocr.models import OCR_MODEL
@@ -15,6 +16,8 @@ if TYPE_CHECKING:
 
 class Ocr:
     SHOW_LOG = True
+    # Batch size of recognition, images of all buttons are recognized in batches
+    REC_BATCH_SIZE = 8
 
     def __init__(self, buttons, lang='nikke', letter=(255, 255, 255), threshold=128, alphabet=None, name=None):
         """
@@ -70,25 +73,31 @@ class Ocr:
         """
         return result
 
-    def ocr(self, image, direct_ocr=False):
+    def ocr_images(self, image, direct_ocr=False):
         """
-            Args:
-                image (np.ndarray, list[np.ndarray]):
-                direct_ocr (bool): True to skip preprocess.
-
-            Returns:
+        Args:
+            image (np.ndarray, list[np.ndarray]):
+            direct_ocr (bool): True to skip preprocess.
 
+        Returns:
+            list[np.ndarray]: Images to recognize.
         """
-        start_time = time.time()
-
         if direct_ocr:
             # image_list = [self.pre_process() for i in image]
-            image_list = [i for i in image]
+            return [i for i in image]
         else:
             # image_list = [self.pre_process(crop(image, area)) for area in self.buttons]
-            image_list = [crop(image, area) for area in self.buttons]
+            return [crop(image, area) for area in self.buttons]
 
-        result_list = self.cnocr.ocr_for_single_lines(image_list)
+    def ocr_results(self, result_list, start_time):
+        """
+        Args:
+            result_list (list[dict]): Results of ocr_for_single_lines()
+            start_time (float):
+
+        Returns:
+            Same as ocr()
+        """
         result_list = [''.join(result.get('text', None)) for result in result_list]
         result_list = [self.after_process(result) for result in result_list]
 
@@ -100,6 +109,116 @@ class Ocr:
 
         return result_list
 
+    @Profiler.timeit('Ocr.ocr')
+    def ocr(self, image, direct_ocr=False):
+        """
+            Args:
+                image (np.ndarray, list[np.ndarray]):
+                direct_ocr (bool): True to skip preprocess.
+
+            Returns:
+
+        """
+        start_time = time.time()
+        image_list = self.ocr_images(image, direct_ocr=direct_ocr)
+        result_list = self.cnocr.ocr_for_single_lines(image_list, batch_size=Ocr.REC_BATCH_SIZE)
+        return self.ocr_results(result_list, start_time)
+
+
+class OcrPending:
+    def __init__(self, collector, ocr, images):
+        """
+        Result of an Ocr object in OcrCollector, available after the collector runs.
+
+        Args:
+            collector (OcrCollector):
+            ocr (Ocr):
+            images (list[np.ndarray]):
+        """
+        self.collector = collector
+        self.ocr = ocr
+        self.images = images
+        self.start_time = time.time()
+        self.done = False
+        self._result = None
+
+    def set(self, result):
+        self._result = result
+        self.done = True
+
+    def result(self):
+        """
+        Returns:
+            Same as Ocr.ocr(). Run all pending OCR in the collector if not yet.
+        """
+        if not self.done:
+            self.collector.run()
+        return self._result
+
+
+class OcrCollector:
+    def __init__(self, rec_batch_size=None):
+        """
+        Collect images from many Ocr objects, and recognize them in one batched call of each model.
+        Batched inference costs much less per image than separate calls on CPU.
+
+        Args:
+            rec_batch_size (int): Batch size of recognition, default to Ocr.REC_BATCH_SIZE
+
+        Examples:
+            collector = OcrCollector()
+            pending = [collector.add(Ocr(area), image) for area in areas]
+            results = [p.result() for p in pending]
+
+            or:
+            with OcrCollector() as collector:
+                pending = [collector.add(Ocr(area), image) for area in areas]
+            results = [p.result() for p in pending]
+        """
+        self.rec_batch_size = rec_batch_size if rec_batch_size else Ocr.REC_BATCH_SIZE
+        self.pending = []
+
+    def add(self, ocr, image, direct_ocr=False):
+        """
+        Args:
+            ocr (Ocr):
+            image (np.ndarray, list[np.ndarray]):
+            direct_ocr (bool): True to skip preprocess.
+
+        Returns:
+            OcrPending:
+        """
+        pending = OcrPending(self, ocr, ocr.ocr_images(image, direct_ocr=direct_ocr))
+        self.pending.append(pending)
+        return pending
+
+    @Profiler.timeit('OcrCollector.run')
+    def run(self):
+        """
+        Recognize all pending images.
+        """
+        pending, self.pending = self.pending, []
+        # key: lang, value: list[OcrPending]
+        groups = {}
+        for item in pending:
+            groups.setdefault(item.ocr.lang, []).append(item)
+
+        for items in groups.values():
+            images = [image for item in items for image in item.images]
+            result_list = items[0].ocr.cnocr.ocr_for_single_lines(images, batch_size=self.rec_batch_size)
+            start = 0
+            for item in items:
+                end = start + len(item.images)
+                item.set(item.ocr.ocr_results(result_list[start:end], item.start_time))
+                start = end
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.run()
+
 
 class Digit(Ocr):
     """
@@ -135,19 +254,15 @@ class DigitCounter(Ocr):
         result = result.replace('I', '1').replace('D', '0').replace('S', '5')
         return result
 
-    def ocr(self, image, direct_ocr=False):
+    def ocr_results(self, result_list, start_time):
         """
         DigitCounter only support doing OCR on one button.
         Do OCR on a counter, such as `14/15`, and returns 14, 1, 15
 
-        Args:
-            image:
-            direct_ocr:
-
         Returns:
             int, int, int: current, remain, total.
         """
-        result_list = super().ocr(image, direct_ocr=direct_ocr)
+        result_list = super().ocr_results(result_list, start_time)
         result = result_list[0] if isinstance(result_list, list) else result_list
 
         result = re.search(r'(\d+)/(\d+)', result)
@@ -0,0 +1,244 @@
+import multiprocessing
+import os
+import queue
+import threading
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from module.base.utils import crop
+from module.logger import logger
+
+# Address and authkey of the running OCR server, inherited by bot processes
+OCR_SERVER_ADDRESS_ENV = 'NKAS_OCR_SERVER'
+OCR_SERVER_AUTHKEY_ENV = 'NKAS_OCR_AUTHKEY'
+
+
+class OcrServer:
+    # Models served, attribute names of OcrModel
+    MODELS = ('nikke', 'cnocr', 'cnocr_num')
+
+    def __init__(self, authkey):
+        """
+        A single process holding OCR models for all NKAS instances.
+        Listens on a Unix socket, or a named pipe on Windows.
+        Each model has one worker thread, `ocr_for_single_lines` requests
+        that arrive while the model is busy are merged into one batch.
+
+        Args:
+            authkey (bytes):
+        """
+        self.authkey = authkey
+        # key: model name, value: queue.Queue of OcrRequest, created in server process
+        self.queues = {}
+
+    def serve(self, conn):
+        """
+        Entry of server process.
+
+        Args:
+            conn (Connection): To send listener address back to the parent process.
+        """
+        from module.ocr.models import OcrModel
+        models = OcrModel()
+        for name in self.MODELS:
+            self.queues[name] = queue.Queue()
+            thread = threading.Thread(
+                target=self._model_worker, args=(getattr(models, f'load_{name}'), self.queues[name]),
+                name=f'OcrModel-{name}', daemon=True)
+            thread.start()
+
+        listener = Listener(authkey=self.authkey)
+        conn.send(listener.address)
+        conn.close()
+        while 1:
+            try:
+                client = listener.accept()
+            except Exception as e:
+                logger.warning(f'OCR server failed to accept: {e}')
+                continue
+            threading.Thread(target=self._client_worker, args=(client,), daemon=True).start()
+
+    def _client_worker(self, client):
+        """
+        Args:
+            client (Connection):
+        """
+        try:
+            while 1:
+                name, method, args, kwargs = client.recv()
+                request = OcrRequest(method, args, kwargs)
+                self.queues[name].put(request)
+                request.done.wait()
+                client.send((request.error, request.result))
+        except (EOFError, OSError):
+            pass
+        finally:
+            client.close()
+
+    @staticmethod
+    def _model_worker(load, requests):
+        """
+        Args:
+            load (callable): Function to load the model.
+            requests (queue.Queue):
+        """
+        try:
+            model = load()
+        except Exception as e:
+            logger.exception(e)
+            model, load_error = None, e
+        while 1:
+            batch = [requests.get()]
+            while 1:
+                try:
+                    batch.append(requests.get_nowait())
+                except queue.Empty:
+                    break
+            if model is None:
+                for request in batch:
+                    request.finish(error=load_error)
+                continue
+
+            lines = [request for request in batch if request.method == 'ocr_for_single_lines']
+            others = [request for request in batch if request.method != 'ocr_for_single_lines']
+            if lines:
+                try:
+                    images = [image for request in lines for image in request.args[0]]
+                    batch_size = max(request.kwargs.get('batch_size', 1) for request in lines)
+                    results = model.ocr_for_single_lines(images, batch_size=batch_size)
+                    start = 0
+                    for request in lines:
+                        end = start + len(request.args[0])
+                        request.finish(result=results[start:end])
+                        start = end
+                except Exception as e:
+                    for request in lines:
+                        request.finish(error=e)
+            for request in others:
+                try:
+                    request.finish(result=getattr(model, request.method)(*request.args, **request.kwargs))
+                except Exception as e:
+                    request.finish(error=e)
+
+
+class OcrRequest:
+    def __init__(self, method, args, kwargs):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.done.set()
+
+
+class RemoteOcr:
+    def __init__(self, name, address, authkey, load):
+        """
+        Same interface as NikkeOcr, but runs on the OCR server.
+        Falls back to a local model if the server is unreachable.
+
+        Args:
+            name (str): Model name, such as 'nikke'.
+            address (str): Listener address of the server.
+            authkey (bytes):
+            load (callable): Function to load the model locally.
+        """
+        self.name = name
+        self.address = address
+        self.authkey = authkey
+        self.load = load
+        self.local = None
+        # One connection per thread, requests on a connection are sequential
+        self._thread_local = threading.local()
+
+    @property
+    def connection(self):
+        conn = getattr(self._thread_local, 'conn', None)
+        if conn is None:
+            conn = self._thread_local.conn = Client(self.address, authkey=self.authkey)
+        return conn
+
+    def _call(self, method, *args, **kwargs):
+        if self.local is None:
+            try:
+                conn = self.connection
+                conn.send((self.name, method, args, kwargs))
+                error, result = conn.recv()
+            except (EOFError, OSError) as e:
+                logger.warning(f'OCR server unavailable ({e}), load model {self.name} locally')
+                self._thread_local.conn = None
+                self.local = self.load()
+            else:
+                if error is not None:
+                    raise error
+                return result
+
+        return getattr(self.local, method)(*args, **kwargs)
+
+    def ocr(self, img_fp, rec_batch_size=1, return_cropped_image=False, area=None, **det_kwargs):
+        """
+        Same as NikkeOcr.ocr()
+        """
+        # Send the cropped area only
+        if area and isinstance(img_fp, np.ndarray):
+            img_fp = crop(img_fp, area)
+        return self._call('ocr', img_fp, rec_batch_size, return_cropped_image, **det_kwargs)
+
+    def ocr_for_single_lines(self, img_list, batch_size=1):
+        """
+        Same as CnOcr.ocr_for_single_lines(), batched with requests from other instances.
+        """
+        return self._call('ocr_for_single_lines', list(img_list), batch_size=batch_size)
+
+    @classmethod
+    def from_env(cls, name, load):
+        """
+        Args:
+            name (str): Model name.
+            load (callable): Function to load the model locally.
+
+        Returns:
+            RemoteOcr: None if OCR server is not started.
+        """
+        address = os.environ.get(OCR_SERVER_ADDRESS_ENV)
+        authkey = os.environ.get(OCR_SERVER_AUTHKEY_ENV)
+        if not address or not authkey:
+            return None
+        return cls(name, address=address, authkey=bytes.fromhex(authkey), load=load)
+
+
+_server_process = None
+
+
+def start_ocr_server():
+    """
+    Start OCR server if not running, and expose it to processes started after this call.
+    Called in webui process before starting NKAS instances.
+
+    Returns:
+        str: Listener address.
+    """
+    global _server_process
+    if _server_process is not None and _server_process.is_alive():
+        return os.environ[OCR_SERVER_ADDRESS_ENV]
+
+    logger.info('Start OCR server')
+    authkey = os.urandom(16)
+    parent, child = multiprocessing.Pipe(duplex=False)
+    server = OcrServer(authkey=authkey)
+    _server_process = multiprocessing.Process(target=server.serve, args=(child,), name='OcrServer', daemon=True)
+    _server_process.start()
+    child.close()
+    address = parent.recv()
+    parent.close()
+
+    os.environ[OCR_SERVER_ADDRESS_ENV] = address
+    os.environ[OCR_SERVER_AUTHKEY_ENV] = authkey.hex()
+    logger.info(f'OCR server started at {address}')
+    return address
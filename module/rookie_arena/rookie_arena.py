@@ -79,27 +79,27 @@ class RookieArena(UI, ArenaBase):
         ]
         # 按照 upper 排序
         r.sort(key=lambda x: x[1])
-        r = [_area_offset(i, (22, -10, 65, 8)) for i in r]
+        areas = [_area_offset(i, (22, -10, 65, 8)) for i in r]
 
         r = [
-            self.ocr_models.__getattribute__("arena").ocr(
-                crop(
-                    crop(self.device.image, i),
-                    _area_offset(
-                        find_letter_area(
-                            extract_letters(
-                                crop(self.device.image, i), letter=(90, 93, 99)
-                            )
-                            < 128
-                        ),
-                        (-2, -2, 3, 2),
+            crop(
+                crop(self.device.image, i),
+                _area_offset(
+                    find_letter_area(
+                        extract_letters(
+                            crop(self.device.image, i), letter=(90, 93, 99)
+                        )
+                        < 128
                     ),
-                )
+                    (-2, -2, 3, 2),
+                ),
             )
-            for i in r
+            for i in areas
         ]
-
-        r = list(map(lambda x: int(x[0]["text"]), r))
+        # 裁剪后只有一行数字，所有对手一次批量识别，跳过文字检测
+        COMPETITOR_POWER = Digit(areas, name="COMPETITOR_POWER", lang="cnocr_num")
+        r = COMPETITOR_POWER.ocr(r, direct_ocr=True)
+        r = r if isinstance(r, list) else [r]
         logger.attr(
             name="%s %ss"
                  % ("COMPETITOR_POWER_LIST", float2str(time.time() - start_time)),
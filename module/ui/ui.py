@@ -69,7 +69,7 @@ class UI(InfoHandler):
         while 1:
             if skip_first_screenshot:
                 skip_first_screenshot = False
-                if not hasattr(self.device, "image") or self.device.image is None:
+                if not hasattr(self.device, "frame") or self.device.frame is None:
                     self.device.screenshot()
             else:
                 self.device.screenshot()
@@ -79,13 +79,13 @@ class UI(InfoHandler):
                 break
 
             # Known pages
-            for page in self.ui_pages:
-                if page.check_button is None:
-                    continue
-                if self.ui_page_appear(page=page):
-                    logger.attr("UI", page.name)
-                    self.ui_current = page
-                    return page
+            pages = [page for page in self.ui_pages if page.check_button is not None]
+            button = self.appear_any([page.check_button for page in pages], offset=(30, 30))
+            if button is not None:
+                page = next(page for page in pages if page.check_button is button)
+                logger.attr("UI", page.name)
+                self.ui_current = page
+                return page
 
             # Unknown page but able to handle
             logger.info("Unknown ui page")
@@ -73,6 +73,10 @@ class ProcessManager:
                 func(mod_name): 创建进程执行的方法，在Alas中，默认为执行
                 AzurLaneAutoScript(config_name='nkas').loop()
             '''
+            if State.deploy_config.OcrServer:
+                # Bot processes inherit the server address from environment
+                from module.ocr.server import start_ocr_server
+                start_ocr_server()
             self._process = Process(
                 target=ProcessManager.run_process,
                 args=(